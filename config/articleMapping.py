@@ -8,45 +8,66 @@ articleMapping = {
             "ignore_above": 256
         },
         "journal": {
-            "type": "text"
+            "type": "text",
+            "fields": {
+                "keyword": {
+                    "type": "keyword",
+                    "ignore_above": 256
+                }
+            }
         },
         "abstract": {
             "type": "text"
         },
         "doi": {
-            "type": "text"
+            "type": "keyword"
         },
         "issn": {
-            "type": "text"
+            "type": "keyword"
         },
         "year": {
-            "type": "text"
+            "type": "short",
+            "ignore_malformed": True
         },
         "volume": {
-            "type": "text"
+            "type": "keyword"
         },
         "issue": {
-            "type": "text"
+            "type": "keyword"
         },
         "pages": {
-            "type": "text"
+            "type": "keyword",
+            "index": False
         },
         "url": {
-            "type": "text"
+            "type": "keyword",
+            "index": False
         },
         "pmc_id": {
-            "type": "text",
-            "fields": {
-                    "keyword": {
-                        "type": "keyword"
-                    }
-            }, },
+            "type": "keyword"
+        },
         "content": {
             "type": "text"
         },
         "path": {
-            "type": "text"
+            "type": "keyword"
         },
+        "analysis": {
+            "properties": {
+                "status": {"type": "keyword"},
+                "version": {"type": "keyword"},
+                "content_hash": {"type": "keyword"},
+                "analyzed_at": {"type": "date", "format": "epoch_second"},
+                "error": {"type": "text"},
+                "sentence_hashes": {"type": "keyword", "index": False, "doc_values": False}
+            }
+        },
+        "vector_source_hash": {
+            "type": "keyword"
+        },
+        # Stays in _source: partial updates (analysis state, edits) rebuild
+        # the document from _source and would silently drop an excluded
+        # vector. Reads leave it out with source filtering instead.
         "vector": {
             "type": "dense_vector",
             "dims": 768,
@@ -56,3 +77,12 @@ articleMapping = {
 
     }
 }
+
+# Documents of one tenant (path) sit together, newest first, so per-user
+# listings and year filters read contiguous blocks.
+articleSettings = {
+    "index": {
+        "sort.field": ["path", "year"],
+        "sort.order": ["asc", "desc"]
+    }
+}
@@ -1,14 +1,22 @@
 tripletsMapping = {
     "properties": {
         "article_id": {
-            "type": "text"
+            "type": "keyword"
         },
         "pmc_id": {
-            "type": "text"
+            "type": "keyword"
+        },
+        "path": {
+            "type": "keyword"
         },
         "sentence_text": {
             "type": "text"
         },
+        "sentence_hash": {
+            "type": "keyword"
+        },
+        # Stays in _source: update_by_query (scripts/rekeyArticlesByPMCID.py)
+        # rewrites documents from _source and would drop an excluded vector.
         "sentence_text_vector": {
             "type": "dense_vector",
             "dims": 768,
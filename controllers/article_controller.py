@@ -1,36 +1,35 @@
-import spacy
 from flask import jsonify
-from elasticsearch import Elasticsearch
-from elasticsearch.exceptions import NotFoundError
+from elasticsearch.exceptions import ApiError, ConflictError, NotFoundError, TransportError
 import os
-from models.article import Article
+from models.article import Article, refresh_vector
 from werkzeug.utils import secure_filename
-from sentence_transformers import SentenceTransformer
-from config.tripletsMapping import tripletsMapping
-import threading
-from controllers.triplets_controller import TripletsController
 from flask_jwt_extended import get_jwt_identity
 from zipfile import ZipFile
-from config.articleMapping import articleMapping
-from metapub import PubMedFetcher
+from services.registry import get_es
+from services.embeddings import encode_query
+from services.ingestion import generate_files, ingest_articles
+from services.jobs import enqueue, is_pending
+from services.pagination import LIST_PAGE_SIZE, InvalidCursor, page_size_arg, scan_with_pit, search_page
+from services.projection import ARTICLE_FIELDS, project, requested_fields, source_filter
+from services.analysis import analyze_hits, is_up_to_date, pending_query
 
-class ArticleController:
-    def __init__(self):
-
-        self.nlp = spacy.load("en_core_web_sm")
+ANALYZE_PAGE_SIZE = int(os.getenv('ANALYZE_PAGE_SIZE', 20))
 
-        elasticsearch_url = os.getenv("ELASTICSEARCH_URL")
+# The index sort order (config/articleMapping.py), so pages are read in
+# the order the segments already hold them.
+ARTICLE_SORT = [{'path': 'asc'}, {'year': 'desc'}]
 
-        self.es = Elasticsearch(elasticsearch_url)
+# Articles whose vector was not rebuilt after their text changed: update()
+# clears vector_source_hash and only a finished re-encode sets it again.
+STALE_VECTOR_QUERY = {'bool': {'must_not': [{'exists': {'field': 'vector_source_hash'}}]}}
 
-        self.model = SentenceTransformer('all-mpnet-base-v2')
+SEARCH_FIELDS = ("title", "authors", "journal", "abstract", "doi", "issn", "year", "url", "pmc_id")
 
-        self.vector_lock = threading.Lock()
 
-    def check_unique_pmc_id(self, pmc_id):
+class ArticleController:
+    def __init__(self):
 
-        result = self.es.search(index="articles", q=f"pmc_id:{pmc_id}")
-        return result["hits"]["total"]["value"] == 0
+        self.es = get_es()
 
     def create_article(self, request):
         main_folder = os.environ.get('MAIN_FOLDER', 'default_main_folder')
@@ -58,15 +57,11 @@ class ArticleController:
 
             data = request.form.to_dict()
 
-            if not self.es.indices.exists(index='articles'):
-                self.es.indices.create(
-                    index='articles', mappings=articleMapping)
-
-            if self.check_unique_pmc_id(data.get('pmc_id')):
+            try:
                 article = Article(
                     **data, vector=[], path=current_user_id)
                 article.save()
-            else:
+            except ConflictError:
                 return jsonify({'error': 'Article already exists'}), 409
 
             return jsonify({'message': 'Article created successfully', 'path': f'static/{main_folder}/{sub_folder}'})
@@ -79,11 +74,42 @@ class ArticleController:
         data = request.form.to_dict()
         article = Article.find_by_id(article_id)
         if article:
-            article.update(data, article_id)
+            if article.update(data, article_id):
+                job_id = enqueue('reencode_article', {'article_id': article_id}, owner=get_jwt_identity())
+                return jsonify({'message': 'Updated article, refreshing its vector', 'job_id': job_id}), 202
             return jsonify({'message': 'Updated article'})
         else:
             return jsonify({'message': 'Article not found'}, 404)
 
+    def run_reencode_article(self, job):
+        refresh_vector(job.params['article_id'])
+        return {'article_id': job.params['article_id']}
+
+    def run_reencode_stale(self, job):
+        total = self.es.count(index='articles', query=STALE_VECTOR_QUERY).get('count', 0)
+        hits = scan_with_pit(self.es, 'articles', query=STALE_VECTOR_QUERY, source=False)
+
+        refreshed, failed = 0, 0
+        for index, hit in enumerate(hits):
+            job.check_cancelled()
+            try:
+                refresh_vector(hit['_id'])
+                refreshed += 1
+            except Exception as e:
+                print(f"Error re-encoding article {hit['_id']}: {e}")
+                failed += 1
+            job.progress(index + 1, total)
+
+        return {'refreshed': refreshed, 'failed': failed}
+
+    def sweep_stale_vectors(self):
+        """Queue a reencode_stale job if a reencode_article job failed or was
+        lost and left an article without an up-to-date vector."""
+        if is_pending('reencode_stale'):
+            return
+        if self.es.count(index='articles', query=STALE_VECTOR_QUERY).get('count', 0):
+            enqueue('reencode_stale', {})
+
     def delete_article(self, article_id):
         article = Article.find_by_id(article_id)
         if article:
@@ -97,111 +123,35 @@ class ArticleController:
 
     def search_articles(self, request):
         query = request.args.get('query')
-        articles = Article.search(query)
-        return jsonify([article.json() for article in articles])
+        return jsonify(Article.search(query, requested_fields(request, ARTICLE_FIELDS)))
     
-    def read_file_with_encodings(self, file_path):
-        encodings = ['utf-8', 'latin-1']
-        for encoding in encodings:
-            try:
-                with open(file_path, 'r', encoding=encoding) as file:
-                    return file.read()
-            except UnicodeDecodeError:
-                continue
-        raise UnicodeDecodeError(
-            f"Cannot decode file {file_path} with available encodings.")
-
-    def calculate_and_save_vector(self, text):
-        try:
-            if not text:
-                return None
-            vector = self.model.encode(text)
-            vector_list = vector.tolist()
-            return vector_list
-        except Exception as e:
-            print(f"Error in calculate_and_save_vector: {e}")
-            return None
-
     def analyze_all_articles(self, request):
-        try:
-            index_name = 'articles'
-            index_name_triplets = 'triplets'
-
-            search_params = request.args.to_dict()
-
-            threads = search_params.get('threads')
-            memory = search_params.get('memory')
-
-            if not self.es.indices.exists(index=index_name_triplets):
-                self.es.indices.create(
-                    index=index_name_triplets, mappings=tripletsMapping)
-
-            response = self.es.search(index=index_name, body={
-                'query': {'match_all': {}}, 'size': 1000})
-
-            hits = response.get('hits', {}).get('hits', [])
-            if not hits:
-                print('No documents found in Elasticsearch')
-                return jsonify({'error': 'No documents found in Elasticsearch'})
-
-            result_collection = []
-            total_articles = len(hits)
-
-            for index, hit in enumerate(hits):
-                result = hit.get('_source', {})
-                article_id, title, content, folder, pmc_id = hit.get('_id', ''), result.get('title', ''), result.get('content', ''), result.get('path', ''), result.get('pmc_id', '')
-
-                doc = self.nlp(content)
-                
-                sentences_and_triplets = TripletsController.extract_triplets(self, doc.sents, memory, threads)
-
-
-                response = {
-                            'article_id': article_id, 
-                            'article_title': title,
-                            'path': folder, 
-                            'data_analysis': sentences_and_triplets,
-                            'pmc_id': pmc_id,
-                            }
-                
-                result_collection.append(response)
-
-
-               
-
-            TripletsController.post_triplets_with_vectors(self, result_collection)
-
-            
+        job_id = enqueue('analyze_all_articles', {}, owner=get_jwt_identity())
+        return jsonify({'job_id': job_id, 'status': 'queued'}), 202
+
+    def run_analyze_all_articles(self, job):
+        index_name = 'articles'
+
+        query = pending_query()
+        total_articles = self.es.count(index=index_name, query=query).get('count', 0)
+        if not total_articles:
+            return {'message': 'All articles are up to date', 'analyzed': 0}
+
+        # Only new, changed, failed or outdated articles are read, and each
+        # one is flushed as soon as it is analysed.
+        hits = scan_with_pit(self.es, index_name, query=query,
+                             source={'excludes': ['vector']}, page_size=ANALYZE_PAGE_SIZE)
+
+        analyzed, failed = 0, 0
+        for index, (hit, response) in enumerate(analyze_hits(self.es, hits)):
+            job.check_cancelled()
+            if response and 'error' in response:
+                failed += 1
+            else:
+                analyzed += 1
+            job.progress(index + 1, total_articles)
 
-            return jsonify({'message': 'Analysis completed successfully for all articles'})
-        
-        except Exception as error:
-            print(f"Error during analysis: {error}")
-            return jsonify({'error': 'An error occurred during analysis'})
-        
-    def get_article_info(self, pmc_number):
-        fetch = PubMedFetcher()
-        try:
-            article = fetch.article_by_pmcid(pmc_number)
-            if article:
-                return {
-                    "pmc_id": pmc_number,
-                    "title": getattr(article, 'title', ''),
-                    "authors": getattr(article, 'authors', ''),
-                    "journal": getattr(article, 'journal', ''),
-                    "abstract": getattr(article, 'abstract', ''),
-                    "doi": getattr(article, 'doi', ''),
-                    "issn": getattr(article, 'issn', ''),
-                    "year": getattr(article, 'year', ''),
-                    "volume": getattr(article, 'volume', ''),
-                    "issue": getattr(article, 'issue', ''),
-                    "pages": getattr(article, 'pages', ''),
-                    "url": getattr(article, 'url', '')
-                }
-        except Exception as e:
-            print(
-                f"Error al obtener información del artículo {pmc_number}: {str(e)}")
-        return None
+        return {'message': 'Analysis completed successfully for all articles', 'analyzed': analyzed, 'failed': failed}
         
     def analyze_articles(self, request):
         try:
@@ -215,9 +165,8 @@ class ArticleController:
 
             search_params = request.args.to_dict()
 
-            threads = search_params.get('threads')
-            memory = search_params.get('memory')
-
+            # threads/memory used to size a per-request CoreNLP server; they
+            # are now pool settings, so ignore them if old clients send them.
             for key, value in search_params.items():
                 if key in ['threads', 'memory']:
                     continue
@@ -228,34 +177,32 @@ class ArticleController:
                 query['bool']['should'] = should_clauses
                 query['bool']['minimum_should_match'] = 1
 
-            if not self.es.indices.exists(index=index_name_triplets):
-                self.es.indices.create(
-                    index=index_name_triplets, mappings=tripletsMapping)
-
-            response = self.es.search(index=index_name, body={'query': query})
+            response = self.es.search(index=index_name, body={'query': query, '_source': {'excludes': ['vector']}})
 
             hits = response.get('hits', {}).get('hits', [])
             if not hits:
                 return jsonify({'error': f'Document not found in Elasticsearch'}), 404
 
-            first_hit = hits[0]
-            result = first_hit.get('_source', {})
-            article_id = first_hit.get('_id', '')
-            title = result.get('title', '')
-            folder = result.get('path', '')
+            pending_hits = [hit for hit in hits if not is_up_to_date(hit.get('_source', {}))]
+
+            if not pending_hits:
+                # Everything matched is already analysed by this version
+                first_hit = hits[0]
+                result = first_hit.get('_source', {})
+                article_id = first_hit.get('_id', '')
+                title = result.get('title', '')
+                folder = result.get('path', '')
 
-            triplets_query = {
-                'bool': {
-                    'must': [{'match': {'article_id': article_id}}]
+                triplets_query = {
+                    'bool': {
+                        'must': [{'match': {'article_id': article_id}}]
+                    }
                 }
-            }
 
-            triplets_response = self.es.search(
-                index=index_name_triplets, body={'query': triplets_query})
-            triplets_hits = triplets_response.get('hits', {}).get('hits', [])
+                triplets_response = self.es.search(
+                    index=index_name_triplets, body={'query': triplets_query})
+                triplets_hits = triplets_response.get('hits', {}).get('hits', [])
 
-            if triplets_hits:
-                # Triplets found, return JSON response immediately
                 triplets_data = [triplet['_source']
                                  for triplet in triplets_hits]
                 for triplet in triplets_data:
@@ -270,34 +217,12 @@ class ArticleController:
                     'existing_triplets': triplets_data
                 })
 
-            for hit in hits:
-                result = hit.get('_source', {})
-                article_id = hit.get('_id', '')
-                title = result.get('title', '')
-                content = result.get('content', '')
-                folder = result.get('path', '')
-                pmc_id = result.get('pmc_id', '')
-
-
-                doc = self.nlp(content)
-                sentences_and_triplets = TripletsController.extract_triplets(
-                    self, doc.sents, memory, threads)
-
-                response = {
-                    'article_id': article_id,
-                    'article_title': title,
-                    'path': folder,
-                    'data_analysis': sentences_and_triplets,
-                    'pmc_id': pmc_id,
-                }
-
-                result_collection.append(response)
-
-            TripletsController.post_triplets_with_vectors(
-                self, result_collection)
+            for hit, response in analyze_hits(self.es, pending_hits):
+                if response is not None:
+                    result_collection.append(response)
 
             for item in result_collection:
-                for analysis_item in item['data_analysis']:
+                for analysis_item in item.get('data_analysis', []):
                     analysis_item.pop('sentence_text_vector', None)
 
             return jsonify(result_collection)
@@ -309,237 +234,83 @@ class ArticleController:
             return jsonify({'error': f'Error during analysis: {str(e)}'})
 
     def analyze_my_articles(self, request):
-        try:
-            result_collection = []
+        job_id = enqueue('analyze_my_articles', {'user_id': get_jwt_identity()}, owner=get_jwt_identity())
+        return jsonify({'job_id': job_id, 'status': 'queued'}), 202
 
-            index_name = 'articles'
-            index_name_triplets = 'triplets'
+    def run_analyze_my_articles(self, job):
+        result_collection = []
 
-            search_params = request.args.to_dict()
+        index_name = 'articles'
 
-            threads = search_params.get('threads')
-            memory = search_params.get('memory')
+        current_user_id = job.params['user_id']
 
-            if not self.es.indices.exists(index=index_name_triplets):
-                self.es.indices.create(
-                    index=index_name_triplets, mappings=tripletsMapping)
+        query = pending_query({'match': {'path': current_user_id}})
+        total_articles = self.es.count(index=index_name, query=query).get('count', 0)
+        if not total_articles:
+            return {'message': 'All your articles are up to date', 'analyzed': 0}
 
-            current_user_id = get_jwt_identity()
+        hits = scan_with_pit(self.es, index_name, query=query,
+                             source={'excludes': ['vector']}, page_size=ANALYZE_PAGE_SIZE)
 
-            response = self.es.search(index=index_name, body={
-                'query': {
-                    'bool': {
-                        'must': [
-                            {'match': {'path': current_user_id}}
-                        ]
-                    }
-                }
-            })
-
-            hits = response.get('hits', {}).get('hits', [])
-            if not hits:
-                return jsonify({'error': f'Document not found in Elasticsearch'})
-
-            first_hit = hits[0]
-            result = first_hit.get('_source', {})
-            article_id = first_hit.get('_id', '')
-            title = result.get('title', '')
-            folder = result.get('path', '')
-
-            triplets_query = {
-                'bool': {
-                    'must': [{'match': {'article_id': article_id}}]
-                }
-            }
-
-            triplets_response = self.es.search(
-                index=index_name_triplets, body={'query': triplets_query})
-            triplets_hits = triplets_response.get('hits', {}).get('hits', [])
-
-            if triplets_hits:
-                # Triplets found, return JSON response immediately
-                triplets_data = [triplet['_source']
-                                 for triplet in triplets_hits]
-                for triplet in triplets_data:
-                    triplet['data_analysis'] = [
-                        {"sentence_text": analysis["sentence_text"], "triplets": analysis["triplets"]} for analysis in triplet.get("data_analysis", [])
-
-                    ]
-                return jsonify({
-                    'article_id': article_id,
-                    'article_title': title,
-                    'path': folder,
-                    'existing_triplets': triplets_data
-                })
-
-            for hit in hits:
-                result = hit.get('_source', {})
-                article_id = hit.get('_id', '')
-                title = result.get('title', '')
-                content = result.get('content', '')
-                folder = result.get('path', '')
-                pmc_id = result.get('pmc_id', '')
-
-                doc = self.nlp(content)
-                sentences_and_triplets = TripletsController.extract_triplets(
-                    self, doc.sents, memory, threads)
-
-                response = {
-                    'article_id': article_id,
-                    'pmc_id': pmc_id,
-                    'article_title': title,
-                    'path': folder,
-                    'data_analysis': sentences_and_triplets
-                }
+        for index, (hit, response) in enumerate(analyze_hits(self.es, hits)):
+            job.check_cancelled()
 
+            if response is not None:
+                for analysis_item in response.get('data_analysis', []):
+                    analysis_item.pop('sentence_text_vector', None)
                 result_collection.append(response)
 
-            TripletsController.post_triplets_with_vectors(
-                self, result_collection)
+            job.progress(index + 1, total_articles)
 
-            for item in result_collection:
-                for analysis_item in item['data_analysis']:
-                    analysis_item.pop('sentence_text_vector', None)
+        return result_collection
 
-            return jsonify(result_collection)
+    def get_all_articles(self, request):
+        return self.list_articles(request, {'match_all': {}}, 'article_id')
 
-        except NotFoundError:
-            return jsonify({'error': f'Document not found in Elasticsearch'})
-
-        except Exception as e:
-            return jsonify({'error': f'Error during analysis: {str(e)}'})
+    def get_my_articles(self, request):
+        current_user_id = get_jwt_identity()
+        return self.list_articles(request, {'match': {'path': current_user_id}}, 'id')
 
-    def get_all_articles(self):
+    def list_articles(self, request, query, id_key):
+        """One cursor page of the articles matching query."""
         try:
             index_name = 'articles'
-            response = self.es.search(index=index_name, body={
-                'query': {
-                    'match_all': {}
-                }
-            })
+            fields = requested_fields(request, ARTICLE_FIELDS)
+            cursor = request.args.get('cursor')
 
-            articles = response.get('hits', {}).get('hits', [])
+            articles, pagination = search_page(
+                self.es, index_name, query=query, sort=ARTICLE_SORT,
+                size=page_size_arg(request.args.get('page_size'), LIST_PAGE_SIZE),
+                cursor=cursor, source=source_filter(fields))
 
-            if not articles:
+            if not articles and not cursor:
                 return jsonify({'error': 'No articles found in Elasticsearch'})
 
-            result_collection = []
+            result_collection = [{id_key: article.get('_id', ''), **project(article, fields)}
+                                 for article in articles]
 
-            for article in articles:
-                result = article.get('_source', {})
-                article_id = article.get('_id', '')
-                title = result.get('title', '')
-                authors = result.get('authors', '')
-                journal = result.get('journal', '')
-                abstract = result.get('abstract', '')
-                doi = result.get('doi', '')
-                issn = result.get('issn', '')
-                year = result.get('year', '')
-                volume = result.get('volume', '')
-                issue = result.get('issue', '')
-                pages = result.get('pages', '')
-                url = result.get('url', '')
-                pmc_id = result.get('pmc_id', '')
-                content = result.get('content', '')
-                path = result.get('path', '')
-
-                result_collection.append({
-                    "article_id": article_id,
-                    "title": title,
-                    "authors": authors,
-                    "journal": journal,
-                    "abstract": abstract,
-                    "doi": doi,
-                    "issn": issn,
-                    "year": year,
-                    "volume": volume,
-                    "issue": issue,
-                    "pages": pages,
-                    "url": url,
-                    "pmc_id": pmc_id,
-                    "content": content,
-                    "path": path,
-                })
+            return jsonify({'result_collection': result_collection, 'pagination_info': {
+                'total_articles': pagination['total'],
+                'current_page': pagination['page'],
+                'next_cursor': pagination['next_cursor'],
+            }})
 
-            return jsonify(result_collection)
+        except InvalidCursor as e:
+            return jsonify({'error': str(e)}), 400
 
         except NotFoundError:
             return jsonify({'error': 'No articles found in Elasticsearch'})
 
-        except Exception as e:
-            return jsonify({'error': f'Error during search: {str(e)}'})
-
-    def get_my_articles(self):
-        try:
-
-            current_user_id = get_jwt_identity()
-
-            index_name = 'articles'
-
-            response = self.es.search(index=index_name, body={
-                'query': {
-                    'bool': {
-                        'must': [
-                            {'match': {'path': current_user_id}}
-                        ]
-                    }
-                }
-            })
-
-            articles = response.get('hits', {}).get('hits', [])
-
-            if not articles:
-                return jsonify({'error': 'No articles found in Elasticsearch'})
-
-            result_collection = []
-
-            for article in articles:
-                result = article.get('_source', {})
-                article_id = article.get('_id', '')
-                title = result.get('title', '')
-                authors = result.get('authors', '')
-                journal = result.get('journal', '')
-                issn = result.get('issn', '')
-                doi = result.get('doi', '')
-                pmc_id = result.get('pmc_id', '')
-                keys = result.get('keys', '')
-                abstract = result.get('abstract', '')
-                objectives = result.get('objectives', '')
-                content = result.get('content', '')
-                methods = result.get('methods', '')
-                results = result.get('results', '')
-                conclusion = result.get('conclusion', '')
-                path = result.get('path', '')
-
-                result_collection.append({
-                    'id': article_id,
-                    'doi': doi,
-                    'path': path,
-                    'issn': issn,
-                    'title': title,
-                    'content': content,
-                    'authors': authors,
-                    'journal': journal,
-                    'pmc_id': pmc_id,
-                    'keys': keys,
-                    'abstract': abstract,
-                    'objectives': objectives,
-                    'methods': methods,
-                    'results': results,
-                    'conclusion': conclusion
-                })
-
-            return jsonify(result_collection)
-
-        except NotFoundError:
-            return jsonify({'error': 'No articles found in Elasticsearch'})
+        # Rejected or unreachable (too many open points in time, say), so
+        # the client should retry later.
+        except (ApiError, TransportError) as e:
+            return jsonify({'error': f'Error during search: {str(e)}'}), 503
 
         except Exception as e:
             return jsonify({'error': f'Error during search: {str(e)}'})
 
-    def search(self, input_keyword, top_k, candidates):
-        model = SentenceTransformer('all-mpnet-base-v2')
-        vector_of_input_keyword = model.encode(input_keyword)
+    def search(self, input_keyword, top_k, candidates, fields=SEARCH_FIELDS):
+        vector_of_input_keyword = encode_query(input_keyword).tolist()
 
         query = {
             "field": "vector",
@@ -550,51 +321,21 @@ class ArticleController:
         res = self.es.knn_search(
             index="articles",
             knn=query,
-            source=["title", "authors", "journal", "abstract", "doi", "issn", "year", "url", "pmc_id"])
+            source=source_filter(fields))
         results = res["hits"]["hits"]
 
         # Convert results to JSON format
-        json_results = []
-        for result in results:
-            if '_source' in result:
-                try:
-                    json_result = {
-                        "id_article": result['_id'],
-                        "title": result['_source']['title'],
-                        "authors": result['_source']['authors'],
-                        "journal": result['_source']['journal'],
-                        "abstract": result['_source']['abstract'],
-                        "doi": result['_source']['doi'],
-                        "issn": result['_source']['issn'],
-                        "year": result['_source']['year'],
-                        "url": result['_source']['url'],
-                        "pmc_id": result['_source']['pmc_id'],
-                    }
-                    json_results.append(json_result)
-                except Exception as e:
-                    print(e)
-
-        return json_results
+        return [{"id_article": result['_id'], **project(result, fields)} for result in results]
 
     def search_articles_with_semantic_search(self, candidates, top_k, query, request):
         query = request.args.get('query', '')
 
         if query:
-            results = self.search(query, top_k, candidates)
+            results = self.search(query, top_k, candidates, requested_fields(request, SEARCH_FIELDS))
             return jsonify({"results": results})
         else:
             return jsonify({"message": "Please provide a search query"})
 
-    def create_articles_from_json(self, json_data):
-        articles = []
-
-        for item in json_data:
-            article = Article(**item)
-            articles.append(article)
-            article.save()
-
-        return articles
-
     def extract_zip(self, zip_path, extract_path):
         with ZipFile(zip_path, 'r') as zip_ref:
             zip_ref.extractall(extract_path)
@@ -627,132 +368,33 @@ class ArticleController:
             # Extraer el archivo zip en la misma carpeta
             self.extract_zip(zip_filename, folder_path)
 
-        articles = []
-
-        def check_unique_pmc_id(pmc_id):
-            result = self.es.search(index="articles", q=f"pmc_id:{pmc_id}")
-            return result["hits"]["total"]["value"] == 0
-
-        for filename in os.listdir(folder_path):
-            if filename.endswith('.txt'):
-                file_path = os.path.join(folder_path, filename)
-                try:
-                    content = self.read_file_with_encodings(file_path)
-                    pmc_id = os.path.splitext(filename)[0]
-                    pmc_number = pmc_id.replace("PMC", "")
-
-                    article_info = self.get_article_info(pmc_number)
-
-                    if article_info is not None:
-                        vector = self.calculate_and_save_vector(
-                            article_info['abstract'])
-                        article_data = {
-                            "title": article_info['title'],
-                            "authors": article_info['authors'],
-                            "journal": article_info['journal'],
-                            "abstract": article_info['abstract'],
-                            "doi": article_info['doi'],
-                            "issn": article_info['issn'],
-                            "year": article_info['year'],
-                            "volume": article_info['volume'],
-                            "issue": article_info['issue'],
-                            "pages": article_info['pages'],
-                            "url": article_info['url'],
-                            "pmc_id": article_info['pmc_id'],
-                            "content": content,
-                            "path": sub_folder,
-                            "vector": vector
-                        }
-
-                        try:
-                            if not self.es.indices.exists(index='articles'):
-                                self.es.indices.create(
-                                    index='articles', mappings=articleMapping)
-                                
-                            if check_unique_pmc_id(pmc_number):
-                                self.es.index(index='articles', document=article_data)
-                                articles.append(article_data)
-                            else:
-                                print(f"El artículo {pmc_number} ya existe en Elasticsearch.")
-                        except Exception as e:
-                            print(
-                                f"Error al enviar datos a Elasticsearch: {str(e)}")
-                except UnicodeDecodeError as e:
-                    print(f"Error al leer archivo {file_path}: {str(e)}")
-                except Exception as e:
-                    print(f"Error al procesar archivo {file_path}: {str(e)}")
-                    continue
-
-        self.create_articles_from_json(articles)
+        summary = ingest_articles(
+            self.es, generate_files(folder_path), sub_folder, collect=True)
 
-        return jsonify({'articles': articles})
+        return jsonify({'articles': summary['articles']})
     
     def post_articles_in_folder(self, folder):
+        job_id = enqueue('post_articles_from_folder', {'folder': folder}, owner=get_jwt_identity())
+        return jsonify({'job_id': job_id, 'status': 'queued'}), 202
+
+    def run_post_articles_in_folder(self, job):
+        folder = job.params['folder']
         main_folder = os.environ.get('MAIN_FOLDER')
         folder_path = os.path.join('static', main_folder, folder)
 
         if not os.path.exists(folder_path):
             os.makedirs(folder_path)
 
-        
+        total_files = sum(1 for filename in os.listdir(folder_path) if filename.endswith('.txt'))
+        job.progress(0, total_files)
 
-        articles = []
-
-        def check_unique_pmc_id(pmc_id):
-            result = self.es.search(index="articles", q=f"pmc_id:{pmc_id}")
-            return result["hits"]["total"]["value"] == 0
-
-        for filename in os.listdir(folder_path):
-            if filename.endswith('.txt'):
-                file_path = os.path.join(folder_path, filename)
-                try:
-                    content = self.read_file_with_encodings(file_path)
-                    pmc_id = os.path.splitext(filename)[0]
-                    pmc_number = pmc_id.replace("PMC", "")
-
-                    article_info = self.get_article_info(pmc_number)
-
-                    if article_info is not None:
-                        vector = self.calculate_and_save_vector(
-                            article_info['abstract'])
-                        article_data = {
-                            "title": article_info['title'],
-                            "authors": article_info['authors'],
-                            "journal": article_info['journal'],
-                            "abstract": article_info['abstract'],
-                            "doi": article_info['doi'],
-                            "issn": article_info['issn'],
-                            "year": article_info['year'],
-                            "volume": article_info['volume'],
-                            "issue": article_info['issue'],
-                            "pages": article_info['pages'],
-                            "url": article_info['url'],
-                            "pmc_id": article_info['pmc_id'],
-                            "content": content,
-                            "path": folder,
-                            "vector": vector
-                        }
-
-                        try:
-                            if not self.es.indices.exists(index='articles'):
-                                self.es.indices.create(
-                                    index='articles', mappings=articleMapping)
-                                
-                            if check_unique_pmc_id(pmc_number):
-                                self.es.index(index='articles', document=article_data)
-                                articles.append(article_data)
-                            else:
-                                print(f"El artículo {pmc_number} ya existe en Elasticsearch.")
-                        except Exception as e:
-                            print(
-                                f"Error al enviar datos a Elasticsearch: {str(e)}")
-                except UnicodeDecodeError as e:
-                    print(f"Error al leer archivo {file_path}: {str(e)}")
-                except Exception as e:
-                    print(f"Error al procesar archivo {file_path}: {str(e)}")
-                    continue
-
-        self.create_articles_from_json(articles)
-
-        return jsonify({'articles': articles})
+        summary = ingest_articles(
+            self.es, generate_files(folder_path), folder,
+            progress=job.progress, cancelled=job.cancelled)
+        job.check_cancelled()
 
+        return {
+            'indexed': summary['indexed'],
+            'skipped': summary['skipped'],
+            'errors': len(summary['errors']),
+        }
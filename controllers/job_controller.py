@@ -0,0 +1,34 @@
+from flask import jsonify
+from flask_jwt_extended import get_jwt_identity
+from services import jobs
+
+
+class JobController:
+    def _get_own_job(self, job_id):
+        job = jobs.get_job(job_id)
+        if job is None or job['owner'] != get_jwt_identity():
+            return None
+        return job
+
+    def get_my_jobs(self):
+        return jsonify(jobs.list_jobs(owner=get_jwt_identity()))
+
+    def get_job(self, job_id):
+        job = self._get_own_job(job_id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(job)
+
+    def get_job_result(self, job_id):
+        job = self._get_own_job(job_id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+        if job['status'] != jobs.COMPLETED:
+            return jsonify({'error': f"Job is {job['status']}", 'job': job}), 409
+        return jsonify(jobs.get_result(job_id))
+
+    def cancel_job(self, job_id):
+        job = self._get_own_job(job_id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(jobs.cancel(job_id))
@@ -1,13 +1,13 @@
 from flask import jsonify
-from elasticsearch import Elasticsearch
 from elasticsearch.exceptions import NotFoundError
-import os
+from services.registry import get_es, get_model
+from services.embedding_server import EMBEDDING_SOCKET
+from services.embeddings import query_cache_info
 
 class StatisticsController:
     def __init__(self):
 
-        elasticsearch_url = os.getenv("ELASTICSEARCH_URL")
-        self.es = Elasticsearch(elasticsearch_url)
+        self.es = get_es()
 
     def get_index_counts(self):
         try:
@@ -24,6 +24,17 @@ class StatisticsController:
         except Exception as e:
             return jsonify({'error': f'Error retrieving index counts: {str(e)}'})
 
+    def get_query_cache_stats(self):
+        return jsonify(query_cache_info())
+
+    def get_embedding_server_stats(self):
+        if not EMBEDDING_SOCKET:
+            return jsonify({'enabled': False})
+        try:
+            return jsonify(dict(get_model().stats(), enabled=True))
+        except Exception as e:
+            return jsonify({'error': f'Error retrieving embedding server stats: {str(e)}'})
+
     def get_index_count(self, index_name):
         try:
             response = self.es.count(index=index_name, body={
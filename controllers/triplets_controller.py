@@ -1,36 +1,29 @@
-import spacy
 from flask import jsonify, make_response
-from elasticsearch import Elasticsearch
-from elasticsearch.exceptions import NotFoundError
-from stanza.server import CoreNLPClient
-import os
-from sentence_transformers import SentenceTransformer
-from config.tripletsMapping import tripletsMapping
-import threading
+from elasticsearch.exceptions import ApiError, NotFoundError, TransportError
 import pandas as pd
 from io import StringIO
 from flask_jwt_extended import get_jwt_identity
+from services.registry import get_es
+from services.embeddings import encode_query
+from services.openie import extract_triplets
+from services.pagination import LIST_PAGE_SIZE, InvalidCursor, page_size_arg, search_page
+from services.projection import TRIPLET_FIELDS, project, requested_fields, source_filter
 
-import torch
-from torch.utils.data import Dataset, DataLoader
 
+# A sentence's triplets are listed next to the other sentences of its article.
+TRIPLET_SORT = [{'article_id': 'asc'}]
 
-class TripletsController:
-    def __init__(self):
-
-        self.nlp = spacy.load("en_core_web_sm")
+# The data set pages only carry the triplets, not the sentences.
+DATA_SET_FIELDS = ('article_id', 'triplets')
 
-        elasticsearch_url = os.getenv("ELASTICSEARCH_URL")
 
-        self.es = Elasticsearch(elasticsearch_url)
-
-        self.model = SentenceTransformer('all-mpnet-base-v2')
+class TripletsController:
+    def __init__(self):
 
-        self.vector_lock = threading.Lock()
+        self.es = get_es()
 
-    def search_triplets(self, input_keyword, top_k, candidates):
-        model = SentenceTransformer('all-mpnet-base-v2')
-        vector_of_input_keyword = model.encode(input_keyword)
+    def search_triplets(self, input_keyword, top_k, candidates, fields=TRIPLET_FIELDS):
+        vector_of_input_keyword = encode_query(input_keyword).tolist()
 
         query = {
             "field": "sentence_text_vector",
@@ -42,268 +35,73 @@ class TripletsController:
         res = self.es.knn_search(
             index="triplets",
             knn=query,
-            source=["article_id", "sentence_text", "triplets"]
+            source=source_filter(fields)
         )
 
-        results = res["hits"]["hits"]
-
-        json_results = []
-        for result in results:
-            if '_source' in result:
-                try:
-                    json_result = {
-                        "article_id": result['_source']['article_id'],
-                        "sentence_text": result['_source']['sentence_text'],
-                        "triplets": result['_source']['triplets']
-                    }
-                    json_results.append(json_result)
-                except Exception as e:
-                    print("Error", e)
-
-        return json_results
+        return [project(result, fields) for result in res["hits"]["hits"]]
 
     def search_triplets_with_semantic_search(self, candidates, top_k, query, request):
         query = request.args.get('query', '')
 
         if query:
-            results = self.search_triplets(query, top_k, candidates)
+            results = self.search_triplets(query, top_k, candidates, requested_fields(request, TRIPLET_FIELDS))
             return jsonify({"results": results})
         else:
             return jsonify({"message": "Please provide a search query"})
 
-    def extract_triplets(self, sentences, memory, threads):
-        sentences_and_triplets = []
-
-        with CoreNLPClient(annotators=["openie"], be_quiet=False, max_mem=memory, threads=threads) as client:
-            for span in sentences:
-                text = span.text if span.text else "Not Found"
-                ann = client.annotate(text)
-                triplet_sentence = []
-
-                for sentence in ann.sentence:
-                    for triple in sentence.openieTriple:
-
-                        triplet = {
-                            'subject': {'text': triple.subject},
-                            'relation': {'text': triple.relation},
-                            'object': {'text': triple.object},
-                        }
-
-                        triplet_sentence.append(triplet)
-
-                    if triplet_sentence:
-                        sentences_and_triplets.append({
-                            'sentence_text': text,
-                            'sentence_text_vector': self.calculate_and_save_vector(text),
-                            'triplets': triplet_sentence,
-                        })
-
-        return sentences_and_triplets
-
-    def post_triplets_with_vectors(self, result_collection):
-        index_name_triplets_vector = 'triplets'
-
-        if not self.es.indices.exists(index=index_name_triplets_vector):
-            self.es.indices.create(
-                index=index_name_triplets_vector, mappings=tripletsMapping)
-
-        for result in result_collection:
-            article_id = result.get('article_id')
-            path = result.get('path')
-            data_analysis_list = result.get('data_analysis', [])
-            pmc_id = result.get('pmc_id')
-
-            try:
-                for data_analysis in data_analysis_list:
-                    sentence_text_vector = data_analysis.get(
-                        'sentence_text_vector')
-                    sentence_text = data_analysis.get('sentence_text')
-                    triplets = data_analysis.get('triplets')
-
-                    if all([article_id, sentence_text_vector, sentence_text]):
-                        triplet_vector_data = {
-                            'article_id': article_id,
-                            'sentence_text_vector': sentence_text_vector,
-                            'sentence_text': sentence_text,
-                            'triplets': triplets,
-                            'path' : path,
-                            'pmc_id': pmc_id
-                        }
-
-                        try:
-                            self.es.index(
-                                index=index_name_triplets_vector, body=triplet_vector_data)
-                            
-                        except Exception as es_error:
-                            print(
-                                f"Error indexing triplet vector data into Elasticsearch: {es_error}")
-                    else:
-                        print(
-                            "Skipping data analysis due to missing values:", data_analysis)
-            except Exception as result_error:
-                print(f"Error processing result: {result_error}")
-
-    def get_all_triplets(self):
-        try:
-            index_name = 'triplets'
-            response = self.es.search(index=index_name, body={
-                'query': {
-                    'match_all': {}
-                }
-            })
-
-            triplets = response.get('hits', {}).get('hits', [])
-
-            if not triplets:
-                return jsonify({'error': 'No triplets found in Elasticsearch'})
-
-            result_collection = []
+    def extract_triplets(self, sentences):
+        return extract_triplets(sentences)
 
-            for triplet in triplets:
-                result = triplet.get('_source', {})
-                triplet_id = triplet.get('_id', '')
-                article_id = result.get('article_id', '')
-                sentence_text = result.get('sentence_text', '')
-                triplets = result.get('triplets', [])
+    def get_all_triplets(self, request):
+        return self.list_triplets(request, {'match_all': {}}, TRIPLET_FIELDS, LIST_PAGE_SIZE)
 
-                result_collection.append({
-                    'id': triplet_id,
-                    'article_id': article_id,
-                    'sentence_text': sentence_text,
-                    'triplets': triplets,
-                })
+    def get_triplets_data_set(self, request, page_size):
+        return self.list_triplets(request, {'match_all': {}}, DATA_SET_FIELDS, page_size)
 
-            return jsonify(result_collection)
-
-        except NotFoundError:
-            return jsonify({'error': 'No articles found in Elasticsearch'})
-
-        except Exception as e:
-            return jsonify({'error': f'Error during search: {str(e)}'})
-        
+    def get_my_triplets(self, request, page_size):
+        current_user_id = get_jwt_identity()
+        return self.list_triplets(request, {'match': {'path': current_user_id}}, DATA_SET_FIELDS, page_size)
 
-    def get_triplets_data_set(self, request, page_number, page_size):
+    def list_triplets(self, request, query, default_fields, page_size):
+        """One cursor page of the triplets matching query."""
         try:
             index_name = 'triplets'
+            fields = requested_fields(request, default_fields)
+            cursor = request.args.get('cursor')
+            page_size = page_size_arg(page_size, LIST_PAGE_SIZE)
 
-            # Parámetros de paginación
-            page_number = int(page_number)
-            page_size = int(page_size)
-
-            # Calcular el índice de inicio y fin para la paginación
-            start_index = (page_number - 1) * page_size
+            triplets, pagination = search_page(
+                self.es, index_name, query=query, sort=TRIPLET_SORT, size=page_size,
+                cursor=cursor, source=source_filter(fields))
 
-            response = self.es.search(index=index_name, body={
-                'query': {
-                    'match_all': {}
-                }
-            })
-
-            triplets = response.get('hits', {}).get('hits', [])
-
-            if not triplets:
+            if not triplets and not cursor:
                 return jsonify({'error': 'No triplets found in Elasticsearch'})
 
-            result_collection = []
-
-            for triplet in triplets:
-                result = triplet.get('_source', {})
-                triplet_id = triplet.get('_id', '')
-                article_id = result.get('article_id', '')
-                triplets = result.get('triplets', [])
-
-                result_collection.append({
-                    'id': triplet_id,
-                    'article_id': article_id,
-                    'triplets': triplets,
-                })
-
-            # Obtener el número total de triplets desde Elasticsearch
-            total_triplets = response.get('hits', {}).get(
-                'total', {}).get('value', 0)
+            result_collection = [{'id': triplet.get('_id', ''), **project(triplet, fields)}
+                                 for triplet in triplets]
 
             # Calcular información de paginación
+            total_triplets = pagination['total']
             total_pages = (total_triplets + page_size - 1) // page_size
-            current_page = page_number
 
             pagination_info = {
                 'total_triplets': total_triplets,
                 'total_pages': total_pages,
-                'current_page': current_page
+                'current_page': pagination['page'],
+                'next_cursor': pagination['next_cursor']
             }
 
             return jsonify({'result_collection': result_collection, 'pagination_info': pagination_info})
 
-        except NotFoundError:
-            return jsonify({'error': 'No articles found in Elasticsearch'})
-
-        except Exception as e:
-            return jsonify({'error': f'Error during search: {str(e)}'})
-       
-        
-    def get_my_triplets(self, request, page_number, page_size):
-        try:
-            current_user_id = get_jwt_identity()
-            index_name = 'triplets'
-
-            # Parámetros de paginación
-            page_number = int(page_number)
-            page_size = int(page_size)
-
-            # Calcular el índice de inicio y fin para la paginación
-            start_index = (page_number - 1) * page_size
-
-            response = self.es.search(index=index_name, body={
-                'query': {
-                    'bool': {
-                        'must': [
-                            {'match': {'path': current_user_id}}
-                        ]
-                    }
-                },
-                'from': start_index,
-                'size': page_size
-            })
-
-           
-            triplets = response.get('hits', {}).get('hits', [])
-
-            if not triplets:
-                return jsonify({'error': 'No triplets found in Elasticsearch'})
-
-            result_collection = []
-
-            for triplet in triplets:
-                result = triplet.get('_source', {})
-                triplet_id = triplet.get('_id', '')
-                article_id = result.get('article_id', '')
-                triplets = result.get('triplets', [])
-
-                result_collection.append({
-                    'id': triplet_id,
-                    'article_id': article_id,
-                    'triplets': triplets,
-                })
-
-            # Obtener el número total de triplets desde Elasticsearch
-            total_triplets = response.get('hits', {}).get(
-                'total', {}).get('value', 0)
-
-            # Calcular información de paginación
-            total_pages = (total_triplets + page_size - 1) // page_size
-            current_page = page_number
-
-            pagination_info = {
-                'total_triplets': total_triplets,
-                'total_pages': total_pages,
-                'current_page': current_page
-            }
-
-            return jsonify({'result_collection': result_collection, 'pagination_info': pagination_info})
+        except InvalidCursor as e:
+            return jsonify({'error': str(e)}), 400
 
         except NotFoundError:
             return jsonify({'error': 'No articles found in Elasticsearch'})
 
+        except (ApiError, TransportError) as e:
+            return jsonify({'error': f'Error during search: {str(e)}'}), 503
+
         except Exception as e:
             return jsonify({'error': f'Error during search: {str(e)}'})
 
@@ -1,7 +1,6 @@
 from flask import jsonify
-from elasticsearch import Elasticsearch
 from elasticsearch.exceptions import NotFoundError
-import os
+from services.registry import get_es
 from passlib.hash import bcrypt
 from flask_jwt_extended import create_access_token
 from elasticsearch.helpers import scan
@@ -10,8 +9,7 @@ from elasticsearch.helpers import scan
 class UserController:
     def __init__(self):
 
-        elasticsearch_url = os.getenv("ELASTICSEARCH_URL")
-        self.es = Elasticsearch(elasticsearch_url)
+        self.es = get_es()
 
     def register_user(self, request):
         user_data = request.get_json()
@@ -0,0 +1,11 @@
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from services.embedding_server import EMBEDDING_SOCKET, serve
+from services.registry import load_encoder
+
+if __name__ == '__main__':
+    if not EMBEDDING_SOCKET:
+        raise SystemExit('EMBEDDING_SOCKET is not set')
+    serve(load_encoder(), EMBEDDING_SOCKET)
@@ -1,7 +1,13 @@
+import gc
+import os
 import socket
 import fcntl
 import struct
 
+from dotenv import load_dotenv
+
+load_dotenv()
+
 def get_ip_address(ifname):
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     return socket.inet_ntoa(fcntl.ioctl(
@@ -13,5 +19,30 @@ def get_ip_address(ifname):
 ip_address = get_ip_address('eth0')
 
 bind = f"{ip_address}:5000"
-workers = 2
-timeout = 1000
\ No newline at end of file
+workers = int(os.getenv('GUNICORN_WORKERS', 2))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 1000))
+
+# With preload the app is imported in the master and the models are loaded
+# there once; workers are forked with them already in (shared) memory.
+preload_app = os.getenv('GUNICORN_PRELOAD', 'false').lower() in ('1', 'true', 'yes')
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+
+    from services.registry import EMBEDDING_SOCKET, get_model, get_nlp
+
+    # Only load weights here; running them before fork would start torch's
+    # thread pools in the master. With an embedding server there is nothing
+    # to load, and a client socket must not be shared across workers.
+    if not EMBEDDING_SOCKET:
+        get_model()
+    get_nlp()
+
+    # Objects that live as long as the process are never collected, and
+    # leaving them out of GC passes keeps their pages shared with workers.
+    gc.collect()
+    gc.freeze()
@@ -1 +1,5 @@
+if [ -n "$EMBEDDING_SOCKET" ]; then
+    python embedding_server.py &
+fi
+python worker.py &
 gunicorn -c ./gunicorn.conf.py 'main:app'
\ No newline at end of file
@@ -1,31 +1,37 @@
+from dotenv import load_dotenv
+
+# Settings are read at import time, so load them before anything else.
+load_dotenv()
+
 from flask import Flask, render_template, request
 from routes.article_routes import articles_routes
 from routes.triplets_routes import triplets_routes
 from routes.user_routes import user_routes
 from routes.statistics_routes import statistics_routes
+from routes.job_routes import job_routes
 
 import os
-import spacy
 from flask_bootstrap import Bootstrap
-from dotenv import load_dotenv
 from flask_swagger_ui import get_swaggerui_blueprint
 from flask_jwt_extended import JWTManager
 from controllers.article_controller import ArticleController
+from services.indices import ensure_indices
 from datetime import timedelta
 from flask_cors import CORS
 
-load_dotenv()
+# Fails fast on mapping drift, before the app serves a single request.
+ensure_indices()
+
 app = Flask(__name__)
 CORS(app)
 app.register_blueprint(articles_routes)
 app.register_blueprint(triplets_routes)
 app.register_blueprint(user_routes)
 app.register_blueprint(statistics_routes)
+app.register_blueprint(job_routes)
 
 bootstap = Bootstrap(app)
 
-nlp = spacy.load("en_core_web_sm")
-
 UPLOAD_FOLDER = 'static'
 if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
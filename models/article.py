@@ -1,18 +1,48 @@
-from config.articleMapping import articleMapping
-from elasticsearch import Elasticsearch
-import spacy
-from sentence_transformers import SentenceTransformer
 import os
 
-model = SentenceTransformer('all-mpnet-base-v2')
+from elasticsearch.exceptions import ConflictError, NotFoundError
 
-elasticsearch_url = os.getenv("ELASTICSEARCH_URL")
+from services.analysis import STALE
+from services.embeddings import EMBEDDING_SOURCE_FIELDS, embedding_source, encode_batch, text_hash
+from services.projection import ARTICLE_FIELDS, project, source_filter
+from services.registry import get_es
 
+REENCODE_MAX_RETRIES = int(os.getenv('REENCODE_MAX_RETRIES', 3))
 
-es = Elasticsearch(elasticsearch_url)
 
+def pmc_document_id(pmc_id):
+    """Articles are keyed by their normalised PMC id, e.g. 'PMC123456'."""
+    if pmc_id is None:
+        return None
+    number = str(pmc_id).strip().upper()
+    if number.startswith('PMC'):
+        number = number[3:].strip()
+    return f"PMC{number}" if number else None
+
+
+def refresh_vector(article_id, attempt=0):
+    """Re-encode the article's vector if its embedding source changed since
+    the vector was built. Retries from a fresh read if the article changed
+    in the meantime; safe to run again after a failure."""
+    es = get_es()
+    try:
+        current = es.get(index='articles', id=article_id, source_excludes=['vector'])
+    except NotFoundError:
+        return
 
-nlp = spacy.load("en_core_web_sm")
+    text = embedding_source(current['_source'])
+    hash_value = text_hash(text)
+    if hash_value == current['_source'].get('vector_source_hash'):
+        return
+
+    doc = {'vector': encode_batch([text])[0] if text else None, 'vector_source_hash': hash_value}
+    try:
+        es.update(index='articles', id=article_id, doc=doc,
+                  if_seq_no=current['_seq_no'], if_primary_term=current['_primary_term'])
+    except ConflictError:
+        if attempt >= REENCODE_MAX_RETRIES:
+            raise
+        refresh_vector(article_id, attempt + 1)
 
 
 class Article:
@@ -53,18 +83,21 @@ class Article:
         }
 
     def calculate_and_save_vector(self, text):
-        vector = model.encode(text)
-        return vector.tolist()
+        return encode_batch([text])[0]
 
     def save(self):
-        self.vector = self.calculate_and_save_vector(self.content)
-        if not es.indices.exists(index='articles'):
-            es.indices.create(index='articles', mappings=articleMapping)
-        es.index(index='articles', body=self.json())
+        document = self.json()
+        text = embedding_source(document)
+        self.vector = self.calculate_and_save_vector(text) if text else None
+        document['vector'] = self.vector
+        document['vector_source_hash'] = text_hash(text)
+        es = get_es()
+        es.index(index='articles', id=pmc_document_id(self.pmc_id),
+                 op_type='create', document=document)
 
     @classmethod
     def find_by_id(cls, article_id):
-        article = es.get(index='articles', id=article_id)
+        article = get_es().get(index='articles', id=article_id)
         if article:
             source = article.get('_source')
             if source:
@@ -88,19 +121,39 @@ class Article:
         return None
 
     def update(self, data, article_id):
+        """Partial update. Returns True when the embedding source changed;
+        the vector is then marked stale and must be refreshed with
+        refresh_vector."""
+        if 'content' in data:
+            # The next analysis run re-checks the content hash and only
+            # re-extracts if it really changed.
+            data = dict(data, analysis={'status': STALE})
+
+        es = get_es()
+        reencode = False
+        if any(field in data for field in EMBEDDING_SOURCE_FIELDS):
+            current = es.get(index='articles', id=article_id, source_excludes=['vector'])
+            text = embedding_source({**current['_source'], **data})
+            if text_hash(text) != current['_source'].get('vector_source_hash'):
+                data = dict(data, vector_source_hash=None)
+                reencode = True
+
         es.update(index='articles', id=article_id, body={'doc': data})
+        return reencode
 
     def delete(self, article_id):
-        es.delete(index='articles', id=article_id)
+        get_es().delete(index='articles', id=article_id)
 
     @staticmethod
-    def search(query):
+    def search(query, fields=ARTICLE_FIELDS):
+        """Articles whose title matches query, as dicts holding only fields."""
         body = {
             "query": {
                 "match": {
                     "title": query
                 }
-            }
+            },
+            "_source": source_filter(fields)
         }
-        result = es.search(index='articles', body=body)
-        return [Article(hit['_source']['title']) for hit in result['hits']['hits']]
+        result = get_es().search(index='articles', body=body)
+        return [{'article_id': hit['_id'], **project(hit, fields)} for hit in result['hits']['hits']]
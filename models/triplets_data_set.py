@@ -1,9 +1,12 @@
 import torch
 from torch.utils.data import Dataset, DataLoader
-from elasticsearch import Elasticsearch, NotFoundError
+from elasticsearch import NotFoundError
 from flask import jsonify
 import os
 
+from services.es_client import create_es
+from services.registry import get_es
+
 
 class TripletsDataset(Dataset):
     def __init__(self, data, max_triplets_length):
@@ -22,8 +25,9 @@ class TripletsDataset(Dataset):
 
 
 class TripletDataLoader:
-    def __init__(self, es):
-        self.es = Elasticsearch(es)
+    def __init__(self, es=None):
+        # es is the URL of another cluster; by default the shared client is used.
+        self.es = create_es(es) if es else get_es()
 
     def my_collate(self, batch, options=None):
         if options is None:
@@ -62,13 +62,13 @@ def analyze_my_articles():
 @articles_routes.route('/article/get_all_articles', methods=['GET'])
 @jwt_required()
 def get_all_articles():
-    return article_controller.get_all_articles()
+    return article_controller.get_all_articles(request)
 
 
 @articles_routes.route('/article/get_my_articles', methods=['GET'])
 @jwt_required()
 def get_my_articles():
-    return article_controller.get_my_articles()
+    return article_controller.get_my_articles(request)
 
 
 @articles_routes.route('/article/articles_semantic_search', methods=['GET'])
@@ -0,0 +1,27 @@
+from flask import Blueprint
+from controllers.job_controller import JobController
+from flask_jwt_extended import jwt_required
+
+job_routes = Blueprint('job', __name__)
+
+job_controller = JobController()
+
+@job_routes.route('/job', methods=['GET'])
+@jwt_required()
+def get_my_jobs():
+    return job_controller.get_my_jobs()
+
+@job_routes.route('/job/<job_id>', methods=['GET'])
+@jwt_required()
+def get_job(job_id):
+    return job_controller.get_job(job_id)
+
+@job_routes.route('/job/<job_id>/result', methods=['GET'])
+@jwt_required()
+def get_job_result(job_id):
+    return job_controller.get_job_result(job_id)
+
+@job_routes.route('/job/<job_id>/cancel', methods=['POST'])
+@jwt_required()
+def cancel_job(job_id):
+    return job_controller.cancel_job(job_id)
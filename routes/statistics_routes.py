@@ -11,4 +11,14 @@ statistics_controller = StatisticsController()
 @statistics_routes.route('/statistics', methods=['GET'])
 @jwt_required()
 def get_statistics():
-    return statistics_controller.get_index_counts()
\ No newline at end of file
+    return statistics_controller.get_index_counts()
+
+@statistics_routes.route('/statistics/query_cache', methods=['GET'])
+@jwt_required()
+def get_query_cache_stats():
+    return statistics_controller.get_query_cache_stats()
+
+@statistics_routes.route('/statistics/embedding_server', methods=['GET'])
+@jwt_required()
+def get_embedding_server_stats():
+    return statistics_controller.get_embedding_server_stats()
@@ -10,21 +10,19 @@ triplets_controller = TripletsController()
 @triplets_routes.route('/triplet/get_all_triplets', methods=['GET'])
 @jwt_required()
 def get_all_triplets():
-    return triplets_controller.get_all_triplets()
+    return triplets_controller.get_all_triplets(request)
 
 @triplets_routes.route('/triplet/get_triplets_data_set', methods=['GET'])
 @jwt_required()
 def get_triplets_data_set():
-    page_number = request.args.get('page_number', 1)
     page_size = request.args.get('page_size', 10)
-    return triplets_controller.get_triplets_data_set(request, page_number=page_number, page_size=page_size)
+    return triplets_controller.get_triplets_data_set(request, page_size=page_size)
 
 @triplets_routes.route('/triplet/get_my_triplets', methods=['GET'])
 @jwt_required()
 def get_my_triplets():
-    page_number = request.args.get('page_number', 1)
     page_size = request.args.get('page_size', 10)
-    return triplets_controller.get_my_triplets(request, page_number=page_number, page_size=page_size)
+    return triplets_controller.get_my_triplets(request, page_size=page_size)
 
 @triplets_routes.route('/triplet/triplets_semantic_search', methods=['GET'])
 @jwt_required()
@@ -1,6 +1,15 @@
-from elasticsearch import Elasticsearch
+import os
+import sys
 
-es = Elasticsearch("http://192.100.170.206:9200")
+from dotenv import load_dotenv
+
+# Settings are read when services are imported, so load them first.
+load_dotenv()
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.es_client import create_es
+
+es = create_es("http://192.100.170.206:9200")
 
 index_name = "articles"
 
@@ -0,0 +1,211 @@
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+# Settings are read when services are imported, so load them first.
+load_dotenv()
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.bulk import bulk_write
+from services.embeddings import embedding_source, encode_batch
+from services.es_client import create_es
+from services.indices import INDICES
+from services.pagination import scan_with_pit
+
+# Moves an alias (articles, triplets, users) onto a new index built from the
+# mapping in config, without downtime:
+#   python scripts/migrateIndex.py articles articles_v2
+# The target is filled by a parallel sliced reindex that keeps the source
+# versions while the source still takes writes. Then the source is made
+# read-only, a second pass copies whatever was written meanwhile, deletes
+# are carried over, the document ids of both sides are compared, and the
+# alias is swapped to the target in one atomic call. Writes fail only
+# between the block and the swap. The old index is kept, read-only, for
+# rollback. A source that is still a concrete index named like the alias
+# is deleted in that same call, which needs --replace-index.
+
+elasticsearch_url = "http://localhost:9200"
+es = create_es(elasticsearch_url)
+
+poll_interval = 10
+batch_size = 500
+
+# Text each vector is built from, for vectors the source index does not
+# keep in _source and the reindex therefore cannot copy.
+vector_sources = {
+    "vector": embedding_source,
+    "sentence_text_vector": lambda source: source.get("sentence_text"),
+}
+
+
+def source_indices(alias):
+    if es.indices.exists_alias(name=alias):
+        return list(es.indices.get_alias(name=alias).body)
+    if es.indices.exists(index=alias):
+        return [alias]
+    raise SystemExit(f"No existe el índice o alias {alias}")
+
+
+def create_target(alias, target):
+    mapping, settings = INDICES[alias]
+    index_settings = dict((settings or {}).get("index", {}))
+    # Nothing reads the target until the swap, so skip refreshes and replicas.
+    index_settings.update({"refresh_interval": "-1", "number_of_replicas": 0})
+    es.indices.create(index=target, mappings=mapping, settings={"index": index_settings})
+
+
+def reindex(sources, target):
+    task_id = es.reindex(
+        source={"index": ",".join(sources)},
+        dest={"index": target, "version_type": "external"},
+        conflicts="proceed",
+        slices="auto",
+        wait_for_completion=False)["task"]
+
+    while True:
+        task = es.tasks.get(task_id=task_id)
+        status = task["task"]["status"]
+        print(f"  {status.get('created', 0)} creados, {status.get('updated', 0)} actualizados, "
+              f"{status.get('version_conflicts', 0)} sin cambios de {status.get('total', 0)}")
+        if task.get("completed"):
+            break
+        time.sleep(poll_interval)
+
+    failures = task.get("response", {}).get("failures", [])
+    if failures:
+        raise SystemExit(f"La reindexación falló: {failures[:5]}")
+
+
+def excluded_vectors(sources):
+    excluded = set()
+    for mapping in es.indices.get_mapping(index=",".join(sources)).body.values():
+        excluded.update(mapping.get("mappings", {}).get("_source", {}).get("excludes", []))
+    return [field for field in vector_sources if field in excluded]
+
+
+def restore_vectors(target, field):
+    """Re-embed documents that arrived without field. Texts embedded before
+    come from the on-disk embedding store, so this rarely runs the model."""
+    es.indices.refresh(index=target)
+    query = {"bool": {"must_not": {"exists": {"field": field}}}}
+
+    def generate_actions():
+        batch = []
+        for hit in scan_with_pit(es, target, query=query, page_size=batch_size):
+            batch.append(hit)
+            if len(batch) >= batch_size:
+                yield from vector_updates(target, field, batch)
+                batch = []
+        if batch:
+            yield from vector_updates(target, field, batch)
+
+    updated, errors = bulk_write(es, generate_actions())
+    print(f"  {updated} vectores de {field} restaurados, {len(errors)} errores")
+
+
+def vector_updates(target, field, batch):
+    texts = [vector_sources[field](hit["_source"]) or "" for hit in batch]
+    vectors = encode_batch(texts)
+    for hit, text, vector in zip(batch, texts, vectors):
+        if text:
+            yield {"_op_type": "update", "_index": target, "_id": hit["_id"], "doc": {field: vector}}
+
+
+def document_ids(index):
+    return {hit["_id"] for hit in scan_with_pit(es, index, source=False, page_size=batch_size * 10)}
+
+
+def carry_over_deletes(sources, target):
+    """Delete from target what was deleted from sources since the first
+    pass, then check both sides hold exactly the same ids."""
+    es.indices.refresh(index=target)
+    source_ids = document_ids(",".join(sources))
+    target_ids = document_ids(target)
+
+    deleted = target_ids - source_ids
+    if deleted:
+        bulk_write(es, ({"_op_type": "delete", "_index": target, "_id": _id} for _id in deleted))
+        print(f"  {len(deleted)} borrados trasladados")
+
+    missing = source_ids - target_ids
+    if missing:
+        raise SystemExit(f"Faltan {len(missing)} documentos en {target} (p. ej. {sorted(missing)[:5]}); alias sin cambiar")
+    return len(source_ids)
+
+
+def block_writes(sources):
+    # add_block waits for in-flight writes, so none lands after the last copy.
+    es.indices.add_block(index=",".join(sources), block="write")
+
+
+def unblock_writes(sources):
+    es.indices.put_settings(index=",".join(sources), settings={"index.blocks.write": None})
+
+
+def swap_alias(alias, sources, target, replace_index):
+    actions = [{"add": {"index": target, "alias": alias}}]
+    for source in sources:
+        if source == alias:
+            if not replace_index:
+                raise SystemExit(f"'{alias}' es un índice, no un alias; repetir con --replace-index para reemplazarlo")
+            actions.append({"remove_index": {"index": source}})
+        else:
+            actions.append({"remove": {"index": source, "alias": alias}})
+    es.indices.update_aliases(actions=actions)
+
+
+def migrate(alias, target, replace_index=False):
+    if alias not in INDICES:
+        raise SystemExit(f"No hay mapping configurado para {alias}")
+
+    sources = source_indices(alias)
+    if target in sources:
+        raise SystemExit(f"{alias} ya apunta a {target}")
+    if any(source == alias for source in sources) and not replace_index:
+        raise SystemExit(f"'{alias}' es un índice, no un alias; repetir con --replace-index para reemplazarlo")
+
+    replicas = es.indices.get_settings(index=sources[0], name="index.number_of_replicas").body
+    replicas = next(iter(replicas.values()))["settings"]["index"]["number_of_replicas"]
+
+    print(f"Creando {target} desde {', '.join(sources)}")
+    create_target(alias, target)
+
+    print("Reindexando")
+    reindex(sources, target)
+
+    # From here until the swap the source takes no writes, so nothing
+    # written after the final copy can be lost.
+    print(f"Bloqueando escrituras en {', '.join(sources)}")
+    block_writes(sources)
+    try:
+        print("Copiando escrituras hechas durante la reindexación")
+        reindex(sources, target)
+        document_count = carry_over_deletes(sources, target)
+
+        # Only after the last copy: the updates bump the target versions,
+        # and a later external-version pass would skip those documents.
+        for field in excluded_vectors(sources):
+            restore_vectors(target, field)
+
+        es.indices.put_settings(index=target, settings={"index": {"refresh_interval": None, "number_of_replicas": replicas}})
+        es.indices.refresh(index=target)
+
+        swap_alias(alias, sources, target, replace_index)
+    except BaseException:
+        unblock_writes(sources)
+        raise
+
+    print(f"{alias} -> {target} ({document_count} documentos)")
+    if not any(source == alias for source in sources):
+        print(f"Índices anteriores conservados en solo lectura para volver atrás: {', '.join(sources)}")
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if len(args) != 2:
+        print("Uso: python scripts/migrateIndex.py <alias> <índice destino> [--replace-index]")
+        sys.exit(1)
+
+    migrate(args[0], args[1], replace_index="--replace-index" in sys.argv)
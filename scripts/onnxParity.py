@@ -0,0 +1,53 @@
+import json
+import os
+import sys
+from elasticsearch.helpers import scan
+from sentence_transformers import SentenceTransformer
+
+from dotenv import load_dotenv
+
+# Settings are read when services are imported, so load them first.
+load_dotenv()
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.es_client import create_es
+from services.onnx_encoder import OnnxSentenceEncoder, parity_check
+from services.registry import MODEL_NAME
+
+# Exports MODEL_NAME to ONNX (fp32 and int8) and reports how far the ONNX
+# vectors drift from the PyTorch ones on a sample of indexed sentences.
+# Switch ENCODER_BACKEND only if the drift is acceptable.
+
+es = create_es("http://localhost:9200")
+
+index_name_triplets = "triplets"
+sample_size = int(os.getenv("PARITY_SAMPLE_SIZE", 2000))
+
+
+def sample_sentences():
+    sentences = []
+    for hit in scan(es, index=index_name_triplets, query={"query": {"match_all": {}}}, _source=["sentence_text"]):
+        text = hit["_source"].get("sentence_text")
+        if text:
+            sentences.append(text)
+        if len(sentences) >= sample_size:
+            break
+    return sentences
+
+
+def run_parity_check():
+    sentences = sample_sentences()
+    if not sentences:
+        print("No hay oraciones indexadas para comparar.")
+        return
+
+    reference = SentenceTransformer(MODEL_NAME, device="cpu")
+    for quantized in (False, True):
+        candidate = OnnxSentenceEncoder(MODEL_NAME, quantized=quantized)
+        report = parity_check(reference, candidate, sentences)
+        report["backend"] = "onnx-int8" if quantized else "onnx"
+        print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    run_parity_check()
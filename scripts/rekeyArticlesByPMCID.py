@@ -0,0 +1,99 @@
+import os
+import sys
+from elasticsearch.helpers import scan
+from tqdm import tqdm
+
+from dotenv import load_dotenv
+
+# Settings are read when services are imported, so load them first.
+load_dotenv()
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.es_client import create_es
+from models.article import pmc_document_id
+from services.bulk import bulk_item_info, bulk_write, is_conflict
+
+# Re-keys articles indexed before documents were keyed by pmc_id: each one is
+# created again under its normalised pmc_id and the old document is deleted.
+# When two old documents share a pmc_id the second create conflicts, which
+# removes the duplicate. Triplets pointing at an old id are re-pointed.
+
+es = create_es("http://localhost:9200")
+
+index_name = "articles"
+index_name_triplets = "triplets"
+batch_size = 500
+has_triplets = es.indices.exists(index=index_name_triplets)
+
+
+def check_triplet_vectors():
+    # update_by_query rewrites triplets from _source; a vector excluded from
+    # _source would be lost for good.
+    for mapping in es.indices.get_mapping(index=index_name_triplets).body.values():
+        if "sentence_text_vector" in mapping.get("mappings", {}).get("_source", {}).get("excludes", []):
+            raise SystemExit("El índice de triplets excluye sentence_text_vector de _source; "
+                             "ejecutar antes python scripts/migrateIndex.py triplets triplets_v2")
+
+
+def repoint_triplets(id_map):
+    should = [{"match_phrase": {"article_id": old_id}} for old_id in id_map]
+    es.update_by_query(
+        index=index_name_triplets,
+        query={"bool": {"should": should, "minimum_should_match": 1}},
+        script={
+            "source": "if (params.ids.containsKey(ctx._source.article_id)) { ctx._source.article_id = params.ids[ctx._source.article_id] } else { ctx.op = 'noop' }",
+            "params": {"ids": id_map}
+        },
+        conflicts="proceed",
+        refresh=True)
+
+
+def rekey_batch(batch):
+    actions = [{
+        "_op_type": "create",
+        "_index": index_name,
+        "_id": new_id,
+        "_source": source
+    } for _, new_id, source in batch]
+    created, failures = bulk_write(es, actions, quiet_conflicts=True)
+
+    failed = {bulk_item_info(item).get("_id") for item in failures if not is_conflict(item)}
+    done = [(old_id, new_id) for old_id, new_id, _ in batch if new_id not in failed]
+
+    if has_triplets and done:
+        repoint_triplets({old_id: new_id for old_id, new_id in done})
+
+    bulk_write(es, ({"_op_type": "delete", "_index": index_name, "_id": old_id} for old_id, _, _ in done))
+
+    return created, len(done) - created
+
+
+def rekey_articles():
+    created_total = 0
+    duplicates_total = 0
+
+    # Materialise the candidate list first so the scan does not see the
+    # documents this script creates.
+    candidates = []
+    for hit in tqdm(scan(es, index=index_name, query={"query": {"match_all": {}}}, _source=["pmc_id"]), desc="Scanning articles"):
+        new_id = pmc_document_id(hit["_source"].get("pmc_id"))
+        if new_id and hit["_id"] != new_id:
+            candidates.append((hit["_id"], new_id))
+
+    for start in tqdm(range(0, len(candidates), batch_size), desc="Re-keying articles"):
+        chunk = candidates[start:start + batch_size]
+        docs = es.mget(index=index_name, ids=[old_id for old_id, _ in chunk])["docs"]
+        batch = [(old_id, new_id, doc["_source"])
+                 for (old_id, new_id), doc in zip(chunk, docs) if doc.get("found")]
+
+        created, duplicates = rekey_batch(batch)
+        created_total += created
+        duplicates_total += duplicates
+
+    print(f"Re-keyed {created_total} articles, removed {duplicates_total} duplicates.")
+
+
+if __name__ == "__main__":
+    if has_triplets:
+        check_triplet_vectors()
+    rekey_articles()
@@ -0,0 +1,201 @@
+import hashlib
+import os
+import time
+from itertools import tee
+
+from services.bulk import bulk_write
+from services.openie import CORENLP_ANNOTATORS, extract_triplets
+from services.pagination import scan_with_pit
+from services.registry import ENCODER_ID, SENTENCE_SEGMENTER
+from services.segmentation import split_sentences_many
+
+# Bump EXTRACTOR_VERSION whenever the way triplets are produced changes, so
+# the next run picks every article up again.
+EXTRACTOR_VERSION = os.getenv('EXTRACTOR_VERSION', '1')
+ANALYSIS_VERSION = f"{EXTRACTOR_VERSION}|{','.join(CORENLP_ANNOTATORS)}|{SENTENCE_SEGMENTER}|{ENCODER_ID}"
+
+ANALYZED = 'analyzed'
+STALE = 'stale'
+FAILED = 'failed'
+
+
+def content_hash(content):
+    return hashlib.sha256((content or '').encode('utf-8')).hexdigest()
+
+
+def sentence_hash(text):
+    # Short enough to keep one per sentence on the article, long enough that
+    # collisions within one article do not happen in practice.
+    return hashlib.sha256((text or '').encode('utf-8')).hexdigest()[:16]
+
+
+def pending_query(query=None):
+    """Articles that were never analysed, changed since, failed, or were
+    analysed by another ANALYSIS_VERSION."""
+    up_to_date = {'bool': {'filter': [
+        {'term': {'analysis.status': ANALYZED}},
+        {'term': {'analysis.version': ANALYSIS_VERSION}},
+    ]}}
+    pending = {'bool': {'must_not': [up_to_date]}}
+    if query:
+        pending['bool']['filter'] = [query]
+    return pending
+
+
+def is_up_to_date(source):
+    analysis = source.get('analysis') or {}
+    return (analysis.get('status') == ANALYZED
+            and analysis.get('version') == ANALYSIS_VERSION
+            and analysis.get('content_hash') == content_hash(source.get('content', '')))
+
+
+def is_unchanged(source):
+    """Content and version match the last successful analysis; only the
+    status is off (an update touched content without changing it)."""
+    analysis = source.get('analysis') or {}
+    return (analysis.get('status') in (ANALYZED, STALE)
+            and analysis.get('version') == ANALYSIS_VERSION
+            and analysis.get('content_hash') == content_hash(source.get('content', '')))
+
+
+def previous_sentence_hashes(source):
+    """Sentence hashes of the last analysis, or None if it cannot be diffed
+    against (never analysed, another version, or analysed before hashes
+    were recorded)."""
+    analysis = source.get('analysis') or {}
+    if analysis.get('version') != ANALYSIS_VERSION or analysis.get('sentence_hashes') is None:
+        return None
+    return set(analysis['sentence_hashes'])
+
+
+def mark_analyzed(es, article_id, hash_value, sentence_hashes=None):
+    analysis = {
+        'status': ANALYZED,
+        'version': ANALYSIS_VERSION,
+        'content_hash': hash_value,
+        'analyzed_at': int(time.time()),
+        'error': None,
+    }
+    if sentence_hashes is not None:
+        analysis['sentence_hashes'] = sorted(sentence_hashes)
+    es.update(index='articles', id=article_id, doc={'analysis': analysis})
+
+
+def mark_failed(es, article_id, error):
+    # Triplets may be half written, so the next run starts from scratch
+    # instead of diffing.
+    es.update(index='articles', id=article_id, doc={'analysis': {
+        'status': FAILED,
+        'error': str(error),
+        'sentence_hashes': None,
+    }})
+
+
+def article_triplets(es, article_id, source=False):
+    """Yield the triplet documents of one article."""
+    includes = ['article_id'] + (list(source) if source else [])
+    yield from scan_with_pit(es, 'triplets', query={'term': {'article_id': article_id}},
+                             source={'includes': includes})
+
+
+def delete_triplets(es, triplet_ids):
+    actions = ({'_op_type': 'delete', '_index': 'triplets', '_id': triplet_id}
+               for triplet_id in triplet_ids)
+    return bulk_write(es, actions)
+
+
+def post_triplets(es, responses):
+    """Index the sentences and triplets of analysis responses."""
+    def generate_actions():
+        for response in responses:
+            article_id = response.get('article_id')
+            path = response.get('path')
+            pmc_id = response.get('pmc_id')
+
+            for data_analysis in response.get('data_analysis', []):
+                sentence_text_vector = data_analysis.get('sentence_text_vector')
+                sentence_text = data_analysis.get('sentence_text')
+
+                if all([article_id, sentence_text_vector, sentence_text]):
+                    yield {
+                        '_index': 'triplets',
+                        '_source': {
+                            'article_id': article_id,
+                            'sentence_text_vector': sentence_text_vector,
+                            'sentence_text': sentence_text,
+                            'sentence_hash': sentence_hash(sentence_text),
+                            'triplets': data_analysis.get('triplets'),
+                            'path': path,
+                            'pmc_id': pmc_id
+                        }
+                    }
+                else:
+                    print("Skipping data analysis due to missing values:", data_analysis)
+
+    return bulk_write(es, generate_actions())
+
+
+def analyze_hits(es, hits):
+    """Analyse article hits one by one, yielding (hit, response).
+
+    Only sentences that were not in the last analysis of the same
+    version are extracted and encoded; triplets of sentences that are
+    gone are deleted. The analysis state is recorded as soon as the
+    article is done. response is None when the content and version
+    already match the last analysis and only the status had to be
+    restored.
+    """
+    hits, hits_for_contents = tee(hits)
+    contents = ('' if is_unchanged(hit.get('_source', {})) else hit.get('_source', {}).get('content', '')
+                for hit in hits_for_contents)
+
+    for hit, sentences in zip(hits, split_sentences_many(contents)):
+        result = hit.get('_source', {})
+        article_id = hit.get('_id', '')
+        article_hash = content_hash(result.get('content', ''))
+
+        if is_unchanged(result):
+            mark_analyzed(es, article_id, article_hash)
+            yield hit, None
+            continue
+
+        previous = previous_sentence_hashes(result)
+        current = set()
+
+        def new_sentences():
+            # Sentences analysed last time keep their triplets as they are.
+            for sentence in sentences:
+                hash_value = sentence_hash(sentence.text)
+                current.add(hash_value)
+                if previous is None or hash_value not in previous:
+                    yield sentence
+
+        try:
+            sentences_and_triplets = extract_triplets(new_sentences())
+
+            response = {
+                'article_id': article_id,
+                'article_title': result.get('title', ''),
+                'path': result.get('path', ''),
+                'data_analysis': sentences_and_triplets,
+                'pmc_id': result.get('pmc_id', ''),
+            }
+
+            if previous is None:
+                removed = None
+                old_triplets = [triplet['_id'] for triplet in article_triplets(es, article_id)]
+            else:
+                removed = previous - current
+                old_triplets = [triplet['_id'] for triplet in article_triplets(es, article_id, source=['sentence_hash'])
+                                if triplet['_source'].get('sentence_hash') in removed] if removed else []
+            delete_triplets(es, old_triplets)
+            post_triplets(es, [response])
+            mark_analyzed(es, article_id, article_hash, current)
+
+            response['removed_sentences'] = len(removed) if removed is not None else 0
+        except Exception as e:
+            print(f"Error analysing article {article_id}: {e}")
+            mark_failed(es, article_id, e)
+            response = {'article_id': article_id, 'error': str(e)}
+
+        yield hit, response
@@ -0,0 +1,45 @@
+import os
+
+from elasticsearch.helpers import streaming_bulk
+
+BULK_CHUNK_SIZE = int(os.getenv('BULK_CHUNK_SIZE', 500))
+BULK_MAX_CHUNK_BYTES = int(os.getenv('BULK_MAX_CHUNK_BYTES', 10 * 1024 * 1024))
+BULK_MAX_RETRIES = int(os.getenv('BULK_MAX_RETRIES', 5))
+BULK_INITIAL_BACKOFF = float(os.getenv('BULK_INITIAL_BACKOFF', 2))
+
+
+def bulk_item_info(item):
+    return next(iter(item.values()), {})
+
+
+def is_conflict(item):
+    return bulk_item_info(item).get('status') == 409
+
+
+def bulk_write(es, actions, chunk_size=None, max_chunk_bytes=None, quiet_conflicts=False):
+    """Stream actions to ES in chunks; 429 rejections are retried with
+    exponential backoff. Returns (ok_count, failed_items).
+
+    With quiet_conflicts, 409s from create-only writes are still returned
+    but not reported, since they only mean the document already exists.
+    """
+    ok_count = 0
+    errors = []
+
+    for ok, item in streaming_bulk(
+            es,
+            actions,
+            chunk_size=chunk_size or BULK_CHUNK_SIZE,
+            max_chunk_bytes=max_chunk_bytes or BULK_MAX_CHUNK_BYTES,
+            max_retries=BULK_MAX_RETRIES,
+            initial_backoff=BULK_INITIAL_BACKOFF,
+            raise_on_error=False,
+            raise_on_exception=False):
+        if ok:
+            ok_count += 1
+        else:
+            errors.append(item)
+            if not (quiet_conflicts and is_conflict(item)):
+                print(f"Error indexing document into Elasticsearch: {item}")
+
+    return ok_count, errors
@@ -0,0 +1,220 @@
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+import numpy as np
+
+from services.registry import EMBEDDING_SOCKET
+
+EMBEDDING_MAX_BATCH = int(os.getenv('EMBEDDING_MAX_BATCH', 64))
+EMBEDDING_MAX_WAIT_MS = float(os.getenv('EMBEDDING_MAX_WAIT_MS', 5))
+EMBEDDING_CONNECT_TIMEOUT = float(os.getenv('EMBEDDING_CONNECT_TIMEOUT', 120))
+
+_HEADER = struct.Struct('>I')
+
+
+def _recv_exactly(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError('Embedding server connection closed')
+        data.extend(chunk)
+    return bytes(data)
+
+
+def _send_message(sock, message, payload=b''):
+    header = json.dumps(message).encode('utf-8')
+    sock.sendall(_HEADER.pack(len(header)) + header + payload)
+
+
+def _recv_message(sock):
+    size, = _HEADER.unpack(_recv_exactly(sock, _HEADER.size))
+    return json.loads(_recv_exactly(sock, size))
+
+
+class _Request:
+    def __init__(self, texts):
+        self.texts = texts
+        self.vectors = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class MicroBatcher:
+    """Encodes requests from many connections in shared batches.
+
+    The first waiting request opens a batch; requests arriving within
+    max_wait_ms join it until it holds max_batch texts.
+    """
+
+    def __init__(self, model, max_batch=EMBEDDING_MAX_BATCH, max_wait_ms=EMBEDDING_MAX_WAIT_MS):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._stats = {'requests': 0, 'texts': 0, 'batches': 0, 'max_batch_size': 0, 'encode_seconds': 0.0}
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def encode(self, texts):
+        request = _Request(texts)
+        self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.vectors
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        size = len(batch[0].texts)
+        deadline = time.monotonic() + self.max_wait
+
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            texts = [text for request in batch for text in request.texts]
+            started = time.monotonic()
+            try:
+                vectors = np.asarray(self.model.encode(texts, batch_size=self.max_batch), dtype=np.float32)
+                position = 0
+                for request in batch:
+                    request.vectors = vectors[position:position + len(request.texts)]
+                    position += len(request.texts)
+            except Exception as e:
+                for request in batch:
+                    request.error = e
+            finally:
+                for request in batch:
+                    request.done.set()
+
+            with self._stats_lock:
+                self._stats['requests'] += len(batch)
+                self._stats['texts'] += len(texts)
+                self._stats['batches'] += 1
+                self._stats['max_batch_size'] = max(self._stats['max_batch_size'], len(texts))
+                self._stats['encode_seconds'] += time.monotonic() - started
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['queue_depth'] = self._queue.qsize()
+        stats['mean_batch_size'] = stats['texts'] / stats['batches'] if stats['batches'] else None
+        stats['max_batch'] = self.max_batch
+        stats['max_wait_ms'] = self.max_wait * 1000
+        return stats
+
+
+def serve(model, socket_path=EMBEDDING_SOCKET):
+    """Serve model over a Unix socket until interrupted."""
+    batcher = MicroBatcher(model)
+
+    class Handler(socketserver.BaseRequestHandler):
+        def handle(self):
+            while True:
+                try:
+                    message = _recv_message(self.request)
+                except ConnectionError:
+                    return
+
+                try:
+                    if message.get('op') == 'encode':
+                        vectors = batcher.encode(message['texts'])
+                        _send_message(self.request, {'shape': list(vectors.shape)}, vectors.tobytes())
+                    elif message.get('op') == 'info':
+                        _send_message(self.request, {'max_seq_length': model.max_seq_length})
+                    elif message.get('op') == 'stats':
+                        _send_message(self.request, batcher.stats())
+                    else:
+                        _send_message(self.request, {'error': f"Unknown op: {message.get('op')}"})
+                except ConnectionError:
+                    return
+                except Exception as e:
+                    _send_message(self.request, {'error': str(e)})
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    with Server(socket_path, Handler) as server:
+        print(f"Embedding server listening on {socket_path}")
+        server.serve_forever()
+
+
+class EmbeddingClient:
+    """Stands in for the local model when EMBEDDING_SOCKET is set: same
+    encode()/max_seq_length surface, one connection per thread."""
+
+    def __init__(self, socket_path=EMBEDDING_SOCKET):
+        self.socket_path = socket_path
+        self._local = threading.local()
+        self.max_seq_length = self._call({'op': 'info'})['max_seq_length']
+
+    def _connect(self):
+        deadline = time.monotonic() + EMBEDDING_CONNECT_TIMEOUT
+        while True:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.socket_path)
+                return sock
+            except (FileNotFoundError, ConnectionRefusedError):
+                sock.close()
+                # The server may still be loading the model.
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(1)
+
+    def _call(self, message, retry=True):
+        sock = getattr(self._local, 'sock', None)
+        if sock is None:
+            sock = self._local.sock = self._connect()
+
+        try:
+            _send_message(sock, message)
+            response = _recv_message(sock)
+            payload = None
+            if 'shape' in response:
+                rows, dims = response['shape']
+                payload = _recv_exactly(sock, rows * dims * 4)
+        except (ConnectionError, OSError):
+            sock.close()
+            self._local.sock = None
+            if not retry:
+                raise
+            return self._call(message, retry=False)
+
+        if 'error' in response:
+            raise RuntimeError(f"Embedding server error: {response['error']}")
+        if payload is not None:
+            response['vectors'] = np.frombuffer(payload, dtype=np.float32).reshape(response['shape'])
+        return response
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        vectors = self._call({'op': 'encode', 'texts': texts})['vectors']
+        return vectors[0] if single else vectors
+
+    def stats(self):
+        return self._call({'op': 'stats'})
@@ -0,0 +1,140 @@
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from services.registry import ENCODER_ID
+
+EMBEDDING_CACHE_DIR = os.getenv('EMBEDDING_CACHE_DIR', 'embedding_cache')
+EMBEDDING_CACHE_LOOKUP_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS vectors (
+    hash TEXT PRIMARY KEY,
+    row INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+class EmbeddingStore:
+    """Content-addressed vectors on local disk.
+
+    Vectors live in one float32 matrix read through np.memmap, one row per
+    text; an SQLite table maps text hashes to rows. Rows are reserved in an
+    IMMEDIATE transaction and only indexed once written, so any number of
+    processes (gunicorn workers, the job worker, scripts) can share a store.
+    """
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.vectors_path = os.path.join(directory, 'vectors.f32')
+        self.index_path = os.path.join(directory, 'index.sqlite3')
+        open(self.vectors_path, 'ab').close()
+
+        with self._connect() as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(self.index_path, timeout=30, isolation_level=None)
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _meta(connection, key):
+        row = connection.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def get_many(self, hashes):
+        """Return {hash: vector} for the hashes that are stored."""
+        unique = list(set(hashes))
+        if not unique:
+            return {}
+
+        rows = {}
+        with self._connect() as connection:
+            dims = self._meta(connection, 'dims')
+            if dims is None:
+                return {}
+            for start in range(0, len(unique), EMBEDDING_CACHE_LOOKUP_CHUNK):
+                chunk = unique[start:start + EMBEDDING_CACHE_LOOKUP_CHUNK]
+                placeholders = ','.join('?' * len(chunk))
+                rows.update(connection.execute(
+                    f'SELECT hash, row FROM vectors WHERE hash IN ({placeholders})', chunk).fetchall())
+
+        if not rows:
+            return {}
+
+        matrix = np.memmap(self.vectors_path, dtype=np.float32, mode='r').reshape(-1, dims)
+        return {hash_value: matrix[row].tolist() for hash_value, row in rows.items()}
+
+    def put_many(self, vectors):
+        """Store {hash: vector}; hashes already stored are left alone."""
+        if not vectors:
+            return
+
+        with self._connect() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                hashes = [hash_value for hash_value in vectors
+                          if connection.execute('SELECT 1 FROM vectors WHERE hash = ?',
+                                                (hash_value,)).fetchone() is None]
+                if not hashes:
+                    connection.execute('COMMIT')
+                    return
+
+                dims = len(vectors[hashes[0]])
+                stored_dims = self._meta(connection, 'dims')
+                if stored_dims is None:
+                    connection.execute('INSERT INTO meta (key, value) VALUES (?, ?)', ('dims', dims))
+                elif stored_dims != dims:
+                    raise ValueError(f'Embedding store holds {stored_dims}-d vectors, got {dims}-d')
+
+                start = self._meta(connection, 'rows') or 0
+                connection.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                                   ('rows', start + len(hashes)))
+
+                needed = (start + len(hashes)) * dims * 4
+                if os.path.getsize(self.vectors_path) < needed:
+                    os.truncate(self.vectors_path, needed)
+                connection.execute('COMMIT')
+            except Exception:
+                connection.execute('ROLLBACK')
+                raise
+
+            matrix = np.memmap(self.vectors_path, dtype=np.float32, mode='r+',
+                               offset=start * dims * 4, shape=(len(hashes), dims))
+            matrix[:] = np.asarray([vectors[hash_value] for hash_value in hashes], dtype=np.float32)
+            matrix.flush()
+            del matrix
+
+            connection.execute('BEGIN')
+            connection.executemany(
+                'INSERT OR IGNORE INTO vectors (hash, row) VALUES (?, ?)',
+                [(hash_value, start + offset) for offset, hash_value in enumerate(hashes)])
+            connection.execute('COMMIT')
+
+
+_lock = threading.Lock()
+_store = None
+
+
+def get_embedding_store():
+    """The store for ENCODER_ID, or None when EMBEDDING_CACHE_DIR is empty."""
+    global _store
+    if _store is None and EMBEDDING_CACHE_DIR:
+        with _lock:
+            if _store is None:
+                model_dir = re.sub(r'[^A-Za-z0-9_.-]+', '_', ENCODER_ID)
+                _store = EmbeddingStore(os.path.join(EMBEDDING_CACHE_DIR, model_dir))
+    return _store
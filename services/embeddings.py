@@ -0,0 +1,133 @@
+import hashlib
+import os
+import re
+import unicodedata
+from functools import lru_cache
+
+import numpy as np
+
+from services.embedding_store import get_embedding_store
+from services.registry import get_model
+
+QUERY_CACHE_SIZE = int(os.getenv('QUERY_CACHE_SIZE', 4096))
+ENCODE_BATCH_SIZE = int(os.getenv('ENCODE_BATCH_SIZE', 32))
+
+
+# Article vectors embed the abstract, or the content when there is none.
+EMBEDDING_SOURCE_FIELDS = ('abstract', 'content')
+
+
+def embedding_source(article_data):
+    for field in EMBEDDING_SOURCE_FIELDS:
+        if article_data.get(field):
+            return article_data[field]
+    return ''
+
+
+def text_hash(text):
+    return hashlib.sha256((text or '').encode('utf-8')).hexdigest()
+
+
+def normalize_query(text):
+    text = unicodedata.normalize('NFKC', text or '')
+    return re.sub(r'\s+', ' ', text).strip().lower()
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def _encode_normalized_query(text):
+    # Shared by every caller, so read-only.
+    vector = np.asarray(get_model().encode(text), dtype=np.float32)
+    vector.setflags(write=False)
+    return vector
+
+
+def encode_query(text):
+    """The query's vector as a read-only float32 array; call tolist() to
+    put it in a request body."""
+    return _encode_normalized_query(normalize_query(text))
+
+
+def query_cache_info():
+    info = _encode_normalized_query.cache_info()
+    return {
+        'hits': info.hits,
+        'misses': info.misses,
+        'size': info.currsize,
+        'max_size': info.maxsize,
+    }
+
+
+def truncate_to_max_seq_length(text, max_seq_length):
+    # Every whitespace-separated word is at least one token, so keeping
+    # max_seq_length words never drops anything the model would have seen.
+    words = text.split()
+    if len(words) <= max_seq_length:
+        return text
+    return ' '.join(words[:max_seq_length])
+
+
+def encode_uncached(texts, batch_size=None):
+    """Vectors for texts, in order, straight from the model (no store)."""
+    model = get_model()
+    batch_size = batch_size or ENCODE_BATCH_SIZE
+    truncated = [truncate_to_max_seq_length(text, model.max_seq_length) for text in texts]
+    order = sorted(range(len(truncated)), key=lambda i: len(truncated[i]))
+
+    vectors = model.encode([truncated[i] for i in order], batch_size=batch_size)
+
+    result = [None] * len(texts)
+    for position, index in enumerate(order):
+        result[index] = vectors[position].tolist()
+    return result
+
+
+def lookup_cached(texts):
+    """Split texts into stored vectors and the ones still to encode.
+
+    Returns (hashes, cached, missing): the hash of every text, {hash:
+    vector} for those in the embedding store, and {hash: text} for the
+    rest, each distinct text once.
+    """
+    hashes = [text_hash(text) for text in texts]
+
+    cached = {}
+    store = get_embedding_store()
+    if store is not None:
+        try:
+            cached = store.get_many(hashes)
+        except Exception as e:
+            print(f"Error reading embedding store: {e}")
+
+    missing = {}
+    for text, hash_value in zip(texts, hashes):
+        if hash_value not in cached:
+            missing.setdefault(hash_value, text)
+    return hashes, cached, missing
+
+
+def store_encoded(vectors):
+    store = get_embedding_store()
+    if store is None:
+        return
+    try:
+        store.put_many(vectors)
+    except Exception as e:
+        print(f"Error writing embedding store: {e}")
+
+
+def encode_batch(texts, batch_size=None):
+    """Vectors for texts, in order.
+
+    Texts already in the on-disk embedding store are not encoded again;
+    new ones are encoded once each and added to it.
+    """
+    if not texts:
+        return []
+
+    hashes, cached, missing = lookup_cached(texts)
+    if missing:
+        vectors = dict(zip(missing, encode_uncached(list(missing.values()), batch_size)))
+        store_encoded(vectors)
+        cached.update(vectors)
+
+    return [cached[hash_value] for hash_value in hashes]
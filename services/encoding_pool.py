@@ -0,0 +1,130 @@
+import multiprocessing
+import os
+import threading
+
+from services.embeddings import ENCODE_BATCH_SIZE, encode_uncached, lookup_cached, store_encoded
+from services.registry import ENCODER_BACKEND, get_model
+
+ENCODE_PROCESSES = int(os.getenv('ENCODE_PROCESSES', os.cpu_count() or 1))
+# Threads each encoding process may use; by default the cores are split
+# evenly so the processes do not oversubscribe them.
+ENCODE_PROCESS_THREADS = int(os.getenv('ENCODE_PROCESS_THREADS', 0))
+# Seconds to wait for one chunk before taking its worker for dead (killed
+# by the OOM killer, crashed in torch), which would otherwise hang forever.
+ENCODE_CHUNK_TIMEOUT = float(os.getenv('ENCODE_CHUNK_TIMEOUT', 600))
+
+
+def _init_worker(threads):
+    import torch
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+
+    if ENCODER_BACKEND in ('onnx', 'onnx-int8'):
+        import services.onnx_encoder
+        services.onnx_encoder.ONNX_INTRA_OP_THREADS = threads
+
+    get_model()
+
+
+def _encode_chunk(texts, batch_size):
+    return encode_uncached(texts, batch_size)
+
+
+class PendingVectors:
+    def __init__(self, pool, hashes, cached, missing, chunks):
+        self._pool = pool
+        self._hashes = hashes
+        self._cached = cached
+        self._missing = missing
+        self._chunks = chunks
+
+    def _result(self, chunk_hashes, result, generation):
+        texts = [self._missing[hash_value] for hash_value in chunk_hashes]
+        if generation != self._pool.generation and not result.ready():
+            # Still queued on a pool that has since been rebuilt; it is lost.
+            return self._pool.encode_chunk(texts)[0].get(ENCODE_CHUNK_TIMEOUT)
+        try:
+            return result.get(ENCODE_CHUNK_TIMEOUT)
+        except multiprocessing.TimeoutError:
+            print(f"Encoding worker timed out after {ENCODE_CHUNK_TIMEOUT}s, restarting the pool")
+            self._pool.restart(generation)
+            return self._pool.encode_chunk(texts)[0].get(ENCODE_CHUNK_TIMEOUT)
+
+    def get(self):
+        """Block until every chunk is encoded; vectors come back in the
+        order the texts were submitted. A chunk that times out is retried
+        once on a rebuilt pool; a second timeout raises
+        multiprocessing.TimeoutError."""
+        vectors = {}
+        for chunk_hashes, result, generation in self._chunks:
+            vectors.update(zip(chunk_hashes, self._result(chunk_hashes, result, generation)))
+        store_encoded(vectors)
+        self._cached.update(vectors)
+        return [self._cached[hash_value] for hash_value in self._hashes]
+
+
+class EncodingPool:
+    """Sentence encoding spread over worker processes.
+
+    Each process loads its own model and is limited to its share of the
+    cores. Submitted texts are bucketed by length, so every chunk a worker
+    encodes pads to about the same length. Stored vectors are looked up and
+    new ones written back in the parent, exactly like encode_batch.
+    """
+
+    def __init__(self, processes=ENCODE_PROCESSES, threads=ENCODE_PROCESS_THREADS, batch_size=None):
+        self.processes = max(1, processes)
+        self.batch_size = batch_size or ENCODE_BATCH_SIZE
+        self.threads = threads or max(1, (os.cpu_count() or 1) // self.processes)
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._pool = self._start()
+
+    def _start(self):
+        # Forking a process that already holds torch state is unsafe.
+        context = multiprocessing.get_context('spawn')
+        return context.Pool(self.processes, initializer=_init_worker, initargs=(self.threads,))
+
+    def restart(self, generation):
+        """Replace the pool, unless it was already replaced since
+        generation. Work still queued on the old pool is lost; pending
+        results notice from the generation and resubmit."""
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._pool.terminate()
+            self._pool = self._start()
+            self.generation += 1
+
+    def encode_chunk(self, texts):
+        """(async result, pool generation) for encoding texts."""
+        with self._lock:
+            return self._pool.apply_async(_encode_chunk, (texts, self.batch_size)), self.generation
+
+    def submit(self, texts):
+        hashes, cached, missing = lookup_cached(texts)
+
+        by_length = sorted(missing, key=lambda hash_value: len(missing[hash_value]))
+        chunks = []
+        for start in range(0, len(by_length), self.batch_size):
+            chunk_hashes = by_length[start:start + self.batch_size]
+            result, generation = self.encode_chunk([missing[hash_value] for hash_value in chunk_hashes])
+            chunks.append((chunk_hashes, result, generation))
+
+        return PendingVectors(self, hashes, cached, missing, chunks)
+
+    def encode(self, texts):
+        return self.submit(texts).get()
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if exc_info[0] is None:
+            self.close()
+        else:
+            self._pool.terminate()
@@ -0,0 +1,33 @@
+import os
+
+from elasticsearch import Elasticsearch
+
+ELASTICSEARCH_URL = os.getenv('ELASTICSEARCH_URL')
+# urllib3 keeps up to this many connections per node open for reuse.
+ES_CONNECTIONS_PER_NODE = int(os.getenv('ES_CONNECTIONS_PER_NODE', 10))
+# Bulk bodies with 768-d vectors compress well; gzip them on the wire.
+ES_HTTP_COMPRESS = os.getenv('ES_HTTP_COMPRESS', 'true').lower() in ('1', 'true', 'yes')
+ES_REQUEST_TIMEOUT = float(os.getenv('ES_REQUEST_TIMEOUT', 30))
+ES_MAX_RETRIES = int(os.getenv('ES_MAX_RETRIES', 3))
+ES_RETRY_ON_TIMEOUT = os.getenv('ES_RETRY_ON_TIMEOUT', 'true').lower() in ('1', 'true', 'yes')
+ES_RETRY_ON_STATUS = tuple(int(status) for status in os.getenv('ES_RETRY_ON_STATUS', '429,502,503,504').split(',') if status)
+# Sniffing replaces the configured URL with the addresses nodes publish,
+# which are often unreachable from containers; only enable it when they are.
+ES_SNIFF = os.getenv('ES_SNIFF', 'false').lower() in ('1', 'true', 'yes')
+ES_SNIFF_INTERVAL = float(os.getenv('ES_SNIFF_INTERVAL', 60))
+
+
+def create_es(url=None):
+    """An Elasticsearch client with the pooling, compression, retry and
+    sniffing settings above. Use get_es() unless another cluster is meant."""
+    return Elasticsearch(
+        url or ELASTICSEARCH_URL,
+        connections_per_node=ES_CONNECTIONS_PER_NODE,
+        http_compress=ES_HTTP_COMPRESS,
+        request_timeout=ES_REQUEST_TIMEOUT,
+        max_retries=ES_MAX_RETRIES,
+        retry_on_timeout=ES_RETRY_ON_TIMEOUT,
+        retry_on_status=ES_RETRY_ON_STATUS,
+        sniff_on_start=ES_SNIFF,
+        sniff_on_node_failure=ES_SNIFF,
+        min_delay_between_sniffing=ES_SNIFF_INTERVAL)
@@ -0,0 +1,113 @@
+import threading
+
+from config.articleMapping import articleMapping, articleSettings
+from config.tripletsMapping import tripletsMapping
+from config.usersMapping import usersMapping
+from services.es_client import create_es
+
+# name: (mappings, settings); the name may be an alias (see scripts/migrateIndex.py).
+INDICES = {
+    'articles': (articleMapping, articleSettings),
+    'triplets': (tripletsMapping, None),
+    'users': (usersMapping, None),
+}
+
+# Settings besides the type that must match for a field to be usable.
+_CHECKED_SETTINGS = ('dims', 'similarity', 'index')
+
+
+class IndexMappingError(Exception):
+    pass
+
+
+_lock = threading.Lock()
+_ready = False
+
+
+def _field_type(field):
+    return field.get('type', 'object' if 'properties' in field else None)
+
+
+def _compare(expected, actual, path, conflicts):
+    """Append conflicting fields to conflicts; return True when expected has
+    fields (or multi-fields) that actual lacks."""
+    missing = False
+
+    for name, field in expected.get('properties', {}).items():
+        field_path = f'{path}{name}'
+        current = actual.get('properties', {}).get(name)
+        if current is None:
+            missing = True
+            continue
+
+        if _field_type(field) != _field_type(current):
+            conflicts.append(f'{field_path}: {_field_type(current)} instead of {_field_type(field)}')
+            continue
+        for setting in _CHECKED_SETTINGS:
+            if setting in field and field[setting] != current.get(setting, field[setting]):
+                conflicts.append(f'{field_path}.{setting}: {current.get(setting)} instead of {field[setting]}')
+
+        if _compare(field, current, f'{field_path}.', conflicts):
+            missing = True
+        if _compare({'properties': field.get('fields', {})},
+                    {'properties': current.get('fields', {})}, f'{field_path}.', conflicts):
+            missing = True
+
+    return missing
+
+
+def _bootstrap_index(es, index, mapping, settings=None):
+    if not es.indices.exists(index=index):
+        # Reads and writes go through the alias, so later mapping changes
+        # can be migrated to <index>_v2 without downtime.
+        es.indices.create(index=f'{index}_v1', mappings=mapping, settings=settings,
+                          aliases={index: {}})
+        return
+
+    # index may be an alias; check every index behind it.
+    for concrete, current in es.indices.get_mapping(index=index).body.items():
+        current = current.get('mappings', {})
+        conflicts = []
+        missing = {}
+        for name, field in mapping['properties'].items():
+            if _compare({'properties': {name: field}}, current, '', conflicts):
+                missing[name] = field
+
+        if conflicts and concrete == index:
+            # Created before indices sat behind aliases; it keeps serving with
+            # its old types until scripts/migrateIndex.py replaces it.
+            print(f"Warning: mapping of legacy index '{concrete}' differs from config "
+                  f"({'; '.join(conflicts)}); run scripts/migrateIndex.py {index} {index}_v1 --replace-index")
+        elif conflicts:
+            raise IndexMappingError(f"Mapping of '{concrete}' differs from config: {'; '.join(conflicts)}")
+        if missing:
+            # New fields are additive, so older indices are brought up to date.
+            es.indices.put_mapping(index=concrete, properties=missing)
+
+
+def ensure_indices(es=None):
+    """Create or validate every index once per process.
+
+    Raises IndexMappingError when an index behind an alias maps a field
+    differently from config; a legacy index named like the alias only gets
+    a warning, so existing deployments boot before they are migrated.
+    Fields that are only missing are added. With
+    no client given, a temporary one is used and closed, so running this in
+    a gunicorn master leaves no connections for the workers to share.
+    """
+    global _ready
+    if _ready:
+        return
+
+    with _lock:
+        if _ready:
+            return
+
+        client = es or create_es()
+        try:
+            for index, (mapping, settings) in INDICES.items():
+                _bootstrap_index(client, index, mapping, settings)
+        finally:
+            if es is None:
+                client.close()
+        _ready = True
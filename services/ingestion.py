@@ -0,0 +1,357 @@
+import os
+import queue
+import threading
+from collections import deque
+
+from metapub import PubMedFetcher
+
+from models.article import pmc_document_id
+from services.bulk import bulk_item_info, bulk_write, is_conflict
+from services.embeddings import ENCODE_BATCH_SIZE, embedding_source, encode_batch, text_hash
+
+INGEST_QUEUE_SIZE = int(os.getenv('INGEST_QUEUE_SIZE', 64))
+INGEST_METADATA_WORKERS = int(os.getenv('INGEST_METADATA_WORKERS', 4))
+INGEST_MGET_BATCH_SIZE = int(os.getenv('INGEST_MGET_BATCH_SIZE', 500))
+
+# What collect keeps of each indexed article; content and the vector would
+# make a large folder's summary grow without bound.
+COLLECTED_FIELDS = ('pmc_id', 'title', 'authors', 'journal', 'year', 'doi', 'path')
+
+ARTICLE_INFO_ATTRIBUTES = ["pmc_id", "title", "authors", "journal", "abstract",
+                           "doi", "issn", "year", "volume", "issue", "pages", "url"]
+
+_DONE = object()
+
+
+class _Failed:
+    """Sent down the queues instead of _DONE when a stage dies, so the
+    stages after it stop and the caller can re-raise the error."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def _put(target_queue, item, aborted):
+    # Gives up once the pipeline is aborted, so a stage never blocks on a
+    # queue nobody reads any more.
+    while not aborted.is_set():
+        try:
+            target_queue.put(item, timeout=1)
+            return
+        except queue.Full:
+            continue
+
+
+def _get(source_queue, aborted):
+    while True:
+        try:
+            return source_queue.get(timeout=1)
+        except queue.Empty:
+            if aborted.is_set():
+                return _DONE
+
+
+def read_file_with_encodings(file_path):
+    encodings = ['utf-8', 'latin-1']
+    for encoding in encodings:
+        try:
+            with open(file_path, 'r', encoding=encoding) as file:
+                return file.read()
+        except UnicodeDecodeError:
+            continue
+    raise UnicodeDecodeError(
+        f"Cannot decode file {file_path} with available encodings.")
+
+
+def generate_files(folder_path):
+    for filename in os.listdir(folder_path):
+        if filename.endswith('.txt'):
+            file_path = os.path.join(folder_path, filename)
+            try:
+                content = read_file_with_encodings(file_path)
+                pmc_id = os.path.splitext(filename)[0].replace("PMC", "")
+                yield file_path, pmc_id, content
+            except Exception as e:
+                print(f"Error al procesar archivo {file_path}: {str(e)}")
+                continue
+
+
+def get_article_info(pmc_number):
+    fetch = PubMedFetcher()
+    try:
+        article = fetch.article_by_pmcid(pmc_number)
+        if article:
+            data = {attr: (getattr(article, attr, '') if getattr(
+                article, attr, '') is not None else '') for attr in ARTICLE_INFO_ATTRIBUTES}
+            data["pmc_id"] = pmc_number
+            return data
+    except Exception as e:
+        print(
+            f"Error al obtener información del artículo {pmc_number}: {str(e)}")
+    return None
+
+
+def existing_pmc_ids(es, pmc_ids):
+    """Return the subset of pmc_ids already indexed, in one mget."""
+    ids = [pmc_document_id(pmc_id) for pmc_id in pmc_ids]
+    response = es.mget(index='articles', ids=ids, source=False)
+    found = {doc['_id'] for doc in response['docs'] if doc.get('found')}
+    return {pmc_id for pmc_id, doc_id in zip(pmc_ids, ids) if doc_id in found}
+
+
+def _enqueue_new_files(es, batch, file_queue, counters, aborted):
+    try:
+        existing = existing_pmc_ids(es, [pmc_number for _, pmc_number, _ in batch])
+    except Exception as e:
+        print(f"Error al consultar Elasticsearch: {str(e)}")
+        existing = set()
+
+    for item in batch:
+        if item[1] in existing:
+            print(f"El artículo {item[1]} ya existe en Elasticsearch.")
+            counters['skipped'] += 1
+        else:
+            _put(file_queue, item, aborted)
+
+
+def _read_stage(es, files, file_queue, metadata_workers, counters, cancelled, aborted):
+    end = _DONE
+    try:
+        batch = []
+        for item in files:
+            batch.append(item)
+            if len(batch) >= INGEST_MGET_BATCH_SIZE:
+                _enqueue_new_files(es, batch, file_queue, counters, aborted)
+                batch = []
+                if (cancelled is not None and cancelled()) or aborted.is_set():
+                    return
+        if batch:
+            _enqueue_new_files(es, batch, file_queue, counters, aborted)
+    except Exception as e:
+        print(f"Error al leer archivos: {str(e)}")
+        end = _Failed(e)
+    finally:
+        for _ in range(metadata_workers):
+            _put(file_queue, end, aborted)
+
+
+def _metadata_stage(file_queue, meta_queue, path, abstract_from_content, aborted):
+    try:
+        _fetch_metadata(file_queue, meta_queue, path, abstract_from_content, aborted)
+    except Exception as e:
+        print(f"Error al obtener metadatos: {str(e)}")
+        _put(meta_queue, _Failed(e), aborted)
+
+
+def _fetch_metadata(file_queue, meta_queue, path, abstract_from_content, aborted):
+    while True:
+        item = _get(file_queue, aborted)
+        if item is _DONE or isinstance(item, _Failed):
+            _put(meta_queue, item, aborted)
+            return
+
+        file_path, pmc_number, content = item
+        try:
+            article_info = get_article_info(pmc_number)
+            if article_info is None:
+                print(f"No se pudo obtener información para el artículo {pmc_number}")
+                continue
+
+            abstract = article_info['abstract']
+            if abstract_from_content and abstract == '':
+                abstract = content
+
+            article_data = {
+                "title": article_info['title'],
+                "authors": article_info['authors'],
+                "journal": article_info['journal'],
+                "abstract": abstract,
+                "doi": article_info['doi'],
+                "issn": article_info['issn'],
+                "year": article_info['year'],
+                "volume": article_info['volume'],
+                "issue": article_info['issue'],
+                "pages": article_info['pages'],
+                "url": article_info['url'],
+                "pmc_id": article_info['pmc_id'],
+                "content": content,
+                "path": path,
+                "vector": None
+            }
+            _put(meta_queue, article_data, aborted)
+        except Exception as e:
+            print(f"Error al procesar archivo {file_path}: {str(e)}")
+
+
+def _attach_vectors(batch, texts, vectors):
+    for article_data, text, vector in zip(batch, texts, vectors):
+        article_data['vector'] = vector
+        if vector is not None:
+            article_data['vector_source_hash'] = text_hash(text)
+
+
+def _encode_articles(batch):
+    texts = [embedding_source(article_data) for article_data in batch]
+    try:
+        vectors = encode_batch(texts)
+    except Exception as e:
+        print(f"Error in encode_batch: {e}")
+        vectors = [None] * len(batch)
+
+    _attach_vectors(batch, texts, vectors)
+
+
+def _encode_stage(meta_queue, encoded_queue, metadata_workers, batch_size, aborted, encoding_pool=None):
+    try:
+        end = _encode_all(meta_queue, encoded_queue, metadata_workers, batch_size, aborted, encoding_pool)
+    except Exception as e:
+        print(f"Error al codificar artículos: {str(e)}")
+        end = _Failed(e)
+    _put(encoded_queue, end, aborted)
+
+
+def _encode_all(meta_queue, encoded_queue, metadata_workers, batch_size, aborted, encoding_pool):
+    """Encode everything the metadata stage sends; returns what to send
+    downstream once done: _DONE, or an upstream _Failed as soon as one
+    arrives."""
+    # With a pool, batches are submitted without waiting and collected in
+    # order once enough are in flight to keep every process busy.
+    in_flight = deque()
+
+    def collect(limit):
+        while len(in_flight) > limit:
+            batch, texts, pending = in_flight.popleft()
+            try:
+                vectors = pending.get()
+            except Exception as e:
+                print(f"Error in encoding pool: {e}")
+                vectors = [None] * len(batch)
+            _attach_vectors(batch, texts, vectors)
+            for article_data in batch:
+                _put(encoded_queue, article_data, aborted)
+
+    finished = 0
+    while finished < metadata_workers:
+        batch = []
+        item = _get(meta_queue, aborted)
+        while True:
+            if item is _DONE:
+                finished += 1
+            elif isinstance(item, _Failed):
+                return item
+            else:
+                batch.append(item)
+
+            if len(batch) >= batch_size or finished == metadata_workers:
+                break
+            try:
+                item = meta_queue.get_nowait()
+            except queue.Empty:
+                break
+
+        if not batch:
+            continue
+
+        if encoding_pool is None:
+            _encode_articles(batch)
+            for article_data in batch:
+                _put(encoded_queue, article_data, aborted)
+        else:
+            texts = [embedding_source(article_data) for article_data in batch]
+            in_flight.append((batch, texts, encoding_pool.submit(texts)))
+            collect(encoding_pool.processes)
+
+    collect(0)
+    return _DONE
+
+
+def ingest_articles(es, files, path, abstract_from_content=False, collect=False,
+                    progress=None, cancelled=None, encoding_pool=None):
+    """Index (file_path, pmc_number, content) tuples as articles.
+
+    Reading, PubMed lookups, encoding and bulk writes run as separate
+    stages joined by bounded queues, so network, CPU and ES I/O overlap.
+    progress(done) is called as files leave the pipeline; once cancelled()
+    returns True no further files are read and the pipeline drains. If a
+    stage dies, the others stop and its exception is raised here, after
+    the articles that were already encoded have been written.
+    With collect, the summary lists the COLLECTED_FIELDS of every article
+    indexed; leave it off for large folders, the counts are always there.
+    With an EncodingPool, articles are encoded across its processes in
+    batches of ENCODE_BATCH_SIZE per process. The articles index must
+    already exist (see services.indices.ensure_indices).
+    """
+
+    file_queue = queue.Queue(maxsize=INGEST_QUEUE_SIZE)
+    meta_queue = queue.Queue(maxsize=INGEST_QUEUE_SIZE)
+    encoded_queue = queue.Queue(maxsize=INGEST_QUEUE_SIZE)
+
+    counters = {'skipped': 0}
+    aborted = threading.Event()
+    failure = None
+
+    stages = [threading.Thread(target=_read_stage, args=(es, files, file_queue, INGEST_METADATA_WORKERS, counters, cancelled, aborted), daemon=True)]
+    stages += [threading.Thread(target=_metadata_stage, args=(file_queue, meta_queue, path, abstract_from_content, aborted), daemon=True)
+               for _ in range(INGEST_METADATA_WORKERS)]
+    encode_batch_size = ENCODE_BATCH_SIZE * (encoding_pool.processes if encoding_pool else 1)
+    stages.append(threading.Thread(target=_encode_stage, args=(meta_queue, encoded_queue, INGEST_METADATA_WORKERS, encode_batch_size, aborted, encoding_pool), daemon=True))
+
+    for stage in stages:
+        stage.start()
+
+    articles = []
+    submitted = 0
+
+    def generate_actions():
+        nonlocal submitted, failure
+        while True:
+            article_data = encoded_queue.get()
+            if article_data is _DONE:
+                return
+            if isinstance(article_data, _Failed):
+                failure = article_data.error
+                return
+
+            submitted += 1
+            if progress is not None and submitted % INGEST_MGET_BATCH_SIZE == 0:
+                progress(counters['skipped'] + submitted)
+
+            if collect:
+                articles.append({field: article_data.get(field) for field in COLLECTED_FIELDS})
+            yield {
+                '_op_type': 'create',
+                '_index': 'articles',
+                '_id': pmc_document_id(article_data['pmc_id']),
+                '_source': article_data
+            }
+
+    try:
+        indexed, failures = bulk_write(es, generate_actions(), quiet_conflicts=True)
+    except BaseException:
+        aborted.set()
+        raise
+    finally:
+        # A dead stage leaves the ones before it blocked on full queues.
+        if failure is not None:
+            aborted.set()
+        for stage in stages:
+            stage.join()
+
+    if failure is not None:
+        raise failure
+
+    if progress is not None:
+        progress(counters['skipped'] + submitted)
+
+    # A create conflict means another writer indexed the same pmc_id first.
+    conflicts = [item for item in failures if is_conflict(item)]
+    errors = [item for item in failures if not is_conflict(item)]
+    failed_ids = {bulk_item_info(item).get('_id') for item in failures}
+
+    return {
+        'indexed': indexed,
+        'skipped': counters['skipped'] + len(conflicts),
+        'errors': errors,
+        'articles': [article_data for article_data in articles
+                     if pmc_document_id(article_data['pmc_id']) not in failed_ids],
+    }
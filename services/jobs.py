@@ -0,0 +1,280 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+JOBS_DB = os.getenv('JOBS_DB', 'jobs.sqlite3')
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 1))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', 2))
+JOB_STALE_SECONDS = int(os.getenv('JOB_STALE_SECONDS', 600))
+
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    owner TEXT,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress INTEGER NOT NULL DEFAULT 0,
+    total INTEGER,
+    result TEXT,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+
+class JobCancelled(Exception):
+    pass
+
+
+_schema_ready = False
+
+
+@contextmanager
+def _connect():
+    global _schema_ready
+    connection = sqlite3.connect(JOBS_DB, timeout=30, isolation_level=None)
+    connection.row_factory = sqlite3.Row
+    try:
+        if not _schema_ready:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.executescript(_SCHEMA)
+            _schema_ready = True
+        yield connection
+    finally:
+        connection.close()
+
+
+def _job_json(row):
+    job = dict(row)
+    job['params'] = json.loads(job['params'])
+    job.pop('result', None)
+    job['cancel_requested'] = bool(job['cancel_requested'])
+
+    elapsed = None
+    if job['started_at']:
+        elapsed = (job['finished_at'] or time.time()) - job['started_at']
+    job['elapsed_seconds'] = elapsed
+    job['throughput'] = job['progress'] / elapsed if elapsed else None
+    return job
+
+
+def enqueue(kind, params, owner=None):
+    job_id = uuid.uuid4().hex
+    with _connect() as connection:
+        connection.execute(
+            'INSERT INTO jobs (id, kind, owner, params, status, created_at) VALUES (?, ?, ?, ?, ?, ?)',
+            (job_id, kind, owner, json.dumps(params), QUEUED, time.time()))
+    return job_id
+
+
+def is_pending(kind):
+    """Whether a job of this kind is queued or running."""
+    with _connect() as connection:
+        row = connection.execute(
+            'SELECT 1 FROM jobs WHERE kind = ? AND status IN (?, ?) LIMIT 1', (kind, QUEUED, RUNNING)).fetchone()
+    return row is not None
+
+
+def get_job(job_id):
+    with _connect() as connection:
+        row = connection.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    return _job_json(row) if row else None
+
+
+def get_result(job_id):
+    with _connect() as connection:
+        row = connection.execute('SELECT result FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    if row is None or row['result'] is None:
+        return None
+    return json.loads(row['result'])
+
+
+def list_jobs(owner=None, limit=50):
+    with _connect() as connection:
+        if owner is None:
+            rows = connection.execute(
+                'SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?', (limit,)).fetchall()
+        else:
+            rows = connection.execute(
+                'SELECT * FROM jobs WHERE owner = ? ORDER BY created_at DESC LIMIT ?', (owner, limit)).fetchall()
+    return [_job_json(row) for row in rows]
+
+
+def cancel(job_id):
+    """Queued jobs are cancelled at once; running ones stop at their next
+    progress update."""
+    now = time.time()
+    with _connect() as connection:
+        connection.execute(
+            'UPDATE jobs SET status = ?, cancel_requested = 1, finished_at = ? WHERE id = ? AND status = ?',
+            (CANCELLED, now, job_id, QUEUED))
+        connection.execute(
+            'UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?',
+            (job_id, RUNNING))
+    return get_job(job_id)
+
+
+def _claim(priority_kinds=(), only=False):
+    """Take the oldest queued job, jobs of priority_kinds first; with only,
+    nothing but those."""
+    marks = ', '.join('?' * len(priority_kinds))
+    if only:
+        sql = f'SELECT * FROM jobs WHERE status = ? AND kind IN ({marks}) ORDER BY created_at LIMIT 1'
+    elif priority_kinds:
+        sql = f'SELECT * FROM jobs WHERE status = ? ORDER BY kind IN ({marks}) DESC, created_at LIMIT 1'
+    else:
+        sql = 'SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1'
+
+    with _connect() as connection:
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(sql, (QUEUED, *priority_kinds)).fetchone()
+            if row is None:
+                connection.execute('COMMIT')
+                return None
+            now = time.time()
+            connection.execute(
+                'UPDATE jobs SET status = ?, started_at = ?, heartbeat_at = ? WHERE id = ?',
+                (RUNNING, now, now, row['id']))
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+    return Job(row['id'], row['kind'], json.loads(row['params']), row['owner'])
+
+
+def _finish(job_id, status, result=None, error=None):
+    with _connect() as connection:
+        connection.execute(
+            'UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?',
+            (status, json.dumps(result) if result is not None else None, error, time.time(), job_id))
+
+
+def _heartbeat(job_id):
+    with _connect() as connection:
+        connection.execute(
+            'UPDATE jobs SET heartbeat_at = ? WHERE id = ?', (time.time(), job_id))
+
+
+def requeue_stale():
+    """Put back jobs whose worker stopped sending heartbeats."""
+    with _connect() as connection:
+        connection.execute(
+            'UPDATE jobs SET status = CASE WHEN cancel_requested THEN ? ELSE ? END, '
+            'progress = 0, started_at = NULL WHERE status = ? AND heartbeat_at < ?',
+            (CANCELLED, QUEUED, RUNNING, time.time() - JOB_STALE_SECONDS))
+
+
+class Job:
+    def __init__(self, job_id, kind, params, owner):
+        self.id = job_id
+        self.kind = kind
+        self.params = params
+        self.owner = owner
+
+    def progress(self, done, total=None):
+        with _connect() as connection:
+            if total is None:
+                connection.execute(
+                    'UPDATE jobs SET progress = ?, heartbeat_at = ? WHERE id = ?',
+                    (done, time.time(), self.id))
+            else:
+                connection.execute(
+                    'UPDATE jobs SET progress = ?, total = ?, heartbeat_at = ? WHERE id = ?',
+                    (done, total, time.time(), self.id))
+
+    def cancelled(self):
+        with _connect() as connection:
+            row = connection.execute(
+                'SELECT cancel_requested FROM jobs WHERE id = ?', (self.id,)).fetchone()
+        return bool(row and row['cancel_requested'])
+
+    def check_cancelled(self):
+        if self.cancelled():
+            raise JobCancelled(self.id)
+
+
+def _run(job, handlers):
+    handler = handlers.get(job.kind)
+    if handler is None:
+        _finish(job.id, FAILED, error=f'Unknown job kind: {job.kind}')
+        return
+
+    # Long steps (one huge article, one PubMed batch) can go a while
+    # without a progress update, so keep the heartbeat going separately.
+    done = threading.Event()
+
+    def beat():
+        while not done.wait(JOB_STALE_SECONDS / 10):
+            try:
+                _heartbeat(job.id)
+            except Exception as e:
+                print(f"Error updating heartbeat for job {job.id}: {e}")
+
+    threading.Thread(target=beat, daemon=True).start()
+
+    try:
+        result = handler(job)
+        _finish(job.id, COMPLETED, result=result)
+    except JobCancelled:
+        _finish(job.id, CANCELLED)
+    except Exception as e:
+        print(f"Error running job {job.id}: {e}")
+        _finish(job.id, FAILED, error=str(e))
+    finally:
+        done.set()
+
+
+def _work(handlers, stopped, priority_kinds=(), only=False):
+    while not stopped.is_set():
+        try:
+            job = _claim(priority_kinds, only)
+        except Exception as e:
+            print(f"Error claiming job: {e}")
+            job = None
+
+        if job is None:
+            stopped.wait(JOB_POLL_INTERVAL)
+            continue
+
+        _run(job, handlers)
+
+
+def run_workers(handlers, workers=JOB_WORKERS, priority_kinds=()):
+    """Drain the queue with `workers` threads until interrupted.
+
+    Jobs of priority_kinds are short and user-facing: they are claimed
+    before anything else, and one extra thread runs only them so they
+    never wait behind a long job.
+    """
+    requeue_stale()
+    stopped = threading.Event()
+    threads = [threading.Thread(target=_work, args=(handlers, stopped, priority_kinds), daemon=True)
+               for _ in range(workers)]
+    if priority_kinds:
+        threads.append(threading.Thread(target=_work, args=(handlers, stopped, priority_kinds, True), daemon=True))
+    for thread in threads:
+        thread.start()
+
+    try:
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(JOB_STALE_SECONDS / 10)
+            requeue_stale()
+    except KeyboardInterrupt:
+        stopped.set()
@@ -0,0 +1,179 @@
+import json
+import os
+import re
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: exports are not guarded against each other
+    fcntl = None
+
+import numpy as np
+import onnxruntime as ort
+from transformers import AutoTokenizer
+
+ONNX_MODEL_DIR = os.getenv('ONNX_MODEL_DIR', 'onnx_models')
+ONNX_INTRA_OP_THREADS = int(os.getenv('ONNX_INTRA_OP_THREADS', 0))
+ONNX_OPSET = 14
+
+
+def _model_dir(model_name):
+    return os.path.join(ONNX_MODEL_DIR, re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name))
+
+
+@contextmanager
+def _export_lock(output_dir):
+    """Held while exporting, so gunicorn workers and the embedding server
+    starting together export once and never read a half-written file."""
+    with open(os.path.join(output_dir, '.export.lock'), 'w') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _tmp_path(path):
+    root, ext = os.path.splitext(path)
+    return f'{root}.tmp{os.getpid()}{ext}'
+
+
+def export_onnx(model_name, quantize=False):
+    """Export the transformer of a SentenceTransformer to ONNX.
+
+    Only the transformer runs in ONNX Runtime; mean pooling and
+    normalisation are done in numpy, so only models built from those
+    modules are supported. With quantize, an int8 dynamically quantised
+    copy is written next to the fp32 model. Files are written under a
+    temporary name and moved into place; encoder.json goes last and marks
+    a finished export.
+    """
+    output_dir = _model_dir(model_name)
+    fp32_path = os.path.join(output_dir, 'model.onnx')
+    int8_path = os.path.join(output_dir, 'model.int8.onnx')
+    config_path = os.path.join(output_dir, 'encoder.json')
+    def exported():
+        return os.path.exists(config_path) and (not quantize or os.path.exists(int8_path))
+
+    if exported():
+        return output_dir
+
+    os.makedirs(output_dir, exist_ok=True)
+    with _export_lock(output_dir):
+        # Another process may have finished the export while this one waited.
+        if not exported():
+            _export(model_name, output_dir, fp32_path, int8_path, config_path, quantize)
+    return output_dir
+
+
+def _export(model_name, output_dir, fp32_path, int8_path, config_path, quantize):
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize, Pooling, Transformer
+
+    model = SentenceTransformer(model_name, device='cpu')
+    modules = list(model)
+    if not isinstance(modules[0], Transformer) or not isinstance(modules[1], Pooling) \
+            or modules[1].get_pooling_mode_str() != 'mean' \
+            or any(not isinstance(module, Normalize) for module in modules[2:]):
+        raise ValueError(f'{model_name}: only Transformer + mean Pooling (+ Normalize) models can be exported')
+
+    if not os.path.exists(config_path):
+        transformer = modules[0].auto_model.eval()
+        sample = modules[0].tokenizer(['An example sentence.'], return_tensors='pt')
+        tmp_path = _tmp_path(fp32_path)
+        with torch.no_grad():
+            torch.onnx.export(
+                transformer,
+                (sample['input_ids'], sample['attention_mask']),
+                tmp_path,
+                input_names=['input_ids', 'attention_mask'],
+                output_names=['last_hidden_state'],
+                dynamic_axes={
+                    'input_ids': {0: 'batch', 1: 'sequence'},
+                    'attention_mask': {0: 'batch', 1: 'sequence'},
+                    'last_hidden_state': {0: 'batch', 1: 'sequence'},
+                },
+                opset_version=ONNX_OPSET)
+        os.replace(tmp_path, fp32_path)
+
+        modules[0].tokenizer.save_pretrained(output_dir)
+        tmp_path = _tmp_path(config_path)
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'max_seq_length': model.max_seq_length,
+                'normalize': len(modules) > 2,
+            }, f)
+        os.replace(tmp_path, config_path)
+
+    if quantize and not os.path.exists(int8_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        tmp_path = _tmp_path(int8_path)
+        quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+        os.replace(tmp_path, int8_path)
+
+
+class OnnxSentenceEncoder:
+    """Drop-in for the parts of SentenceTransformer this app uses:
+    encode() and max_seq_length."""
+
+    def __init__(self, model_name, quantized=False):
+        model_dir = export_onnx(model_name, quantize=quantized)
+
+        with open(os.path.join(model_dir, 'encoder.json')) as f:
+            config = json.load(f)
+        self.max_seq_length = config['max_seq_length']
+        self.normalize = config['normalize']
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+        options = ort.SessionOptions()
+        if ONNX_INTRA_OP_THREADS:
+            options.intra_op_num_threads = ONNX_INTRA_OP_THREADS
+        model_file = 'model.int8.onnx' if quantized else 'model.onnx'
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, model_file), options, providers=['CPUExecutionProvider'])
+
+    def _encode_batch(self, texts):
+        tokens = self.tokenizer(texts, padding=True, truncation=True,
+                                max_length=self.max_seq_length, return_tensors='np')
+        attention_mask = tokens['attention_mask'].astype(np.int64)
+        hidden = self.session.run(None, {
+            'input_ids': tokens['input_ids'].astype(np.int64),
+            'attention_mask': attention_mask,
+        })[0]
+
+        mask = attention_mask[..., None].astype(np.float32)
+        vectors = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return vectors.astype(np.float32)
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        vectors = np.concatenate([self._encode_batch(texts[start:start + batch_size])
+                                  for start in range(0, len(texts), batch_size)])
+        return vectors[0] if single else vectors
+
+
+def parity_check(reference, candidate, texts, batch_size=32):
+    """Cosine drift (1 - cosine similarity) of candidate vectors against
+    reference ones over texts."""
+    expected = np.asarray(reference.encode(texts, batch_size=batch_size), dtype=np.float32)
+    actual = np.asarray(candidate.encode(texts, batch_size=batch_size), dtype=np.float32)
+
+    cosine = (expected * actual).sum(axis=1) / (
+        np.linalg.norm(expected, axis=1) * np.linalg.norm(actual, axis=1))
+    drift = 1 - cosine
+    return {
+        'texts': len(texts),
+        'mean_drift': float(drift.mean()),
+        'max_drift': float(drift.max()),
+        'p99_drift': float(np.percentile(drift, 99)),
+        'min_cosine': float(cosine.min()),
+    }
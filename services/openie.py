@@ -0,0 +1,223 @@
+import atexit
+import os
+from bisect import bisect_right
+import queue
+import threading
+from contextlib import contextmanager
+
+from stanza.server import CoreNLPClient, StartServer
+
+from services.embeddings import encode_batch
+
+CORENLP_INSTANCES = int(os.getenv('CORENLP_INSTANCES', 1))
+CORENLP_START_PORT = int(os.getenv('CORENLP_START_PORT', 9000))
+CORENLP_THREADS = int(os.getenv('THREADS', 5))
+CORENLP_MEMORY = os.getenv('MEMORY', '4G')
+CORENLP_TIMEOUT = int(os.getenv('CORENLP_TIMEOUT', 60000))
+CORENLP_ANNOTATORS = os.getenv('CORENLP_ANNOTATORS', 'openie').split(',')
+CORENLP_HEALTH_INTERVAL = int(os.getenv('CORENLP_HEALTH_INTERVAL', 30))
+CORENLP_ANNOTATION_MODE = os.getenv('CORENLP_ANNOTATION_MODE', 'window')
+CORENLP_WINDOW_SENTENCES = int(os.getenv('CORENLP_WINDOW_SENTENCES', 64))
+CORENLP_WINDOW_CHARS = int(os.getenv('CORENLP_WINDOW_CHARS', 50000))
+
+# CoreNLP always breaks sentences on a blank line, so joining with one keeps
+# every source sentence apart while still letting CoreNLP split inside it
+# exactly as it does when the sentence is annotated on its own.
+SENTENCE_SEPARATOR = '\n\n'
+
+
+class CoreNLPPool:
+    """Long-lived CoreNLP servers on consecutive ports.
+
+    Servers are started with TRY_START, so every process on the host that
+    points at the same ports shares whichever servers are already up.
+    Callers check a client out, which spreads concurrent work across the
+    instances; a supervisor thread restarts idle servers that stop answering.
+    """
+
+    def __init__(self, instances=CORENLP_INSTANCES, start_port=CORENLP_START_PORT):
+        self.clients = [
+            CoreNLPClient(
+                annotators=CORENLP_ANNOTATORS,
+                endpoint=f'http://localhost:{start_port + offset}',
+                start_server=StartServer.TRY_START,
+                memory=CORENLP_MEMORY,
+                threads=CORENLP_THREADS,
+                timeout=CORENLP_TIMEOUT,
+                be_quiet=True)
+            for offset in range(instances)
+        ]
+        self.restarts = 0
+        self._idle = queue.Queue()
+        for client in self.clients:
+            self._idle.put(client)
+
+        self._stopped = threading.Event()
+        self._supervisor = threading.Thread(target=self._supervise, daemon=True)
+        self._supervisor.start()
+
+    def _ensure_alive(self, client):
+        try:
+            if client.is_alive():
+                return
+        except Exception:
+            pass
+        print(f"Restarting CoreNLP server at {client.endpoint}")
+        self.restarts += 1
+        client.ensure_alive()
+
+    @contextmanager
+    def client(self):
+        client = self._idle.get()
+        try:
+            self._ensure_alive(client)
+            yield client
+        finally:
+            self._idle.put(client)
+
+    def _supervise(self):
+        while not self._stopped.wait(CORENLP_HEALTH_INTERVAL):
+            for _ in range(len(self.clients)):
+                try:
+                    client = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    self._ensure_alive(client)
+                except Exception as e:
+                    print(f"CoreNLP health check failed at {client.endpoint}: {e}")
+                finally:
+                    self._idle.put(client)
+
+    def status(self):
+        instances = []
+        for client in self.clients:
+            try:
+                alive = client.is_alive()
+            except Exception:
+                alive = False
+            instances.append({'endpoint': client.endpoint, 'alive': alive})
+        return {'instances': instances, 'restarts': self.restarts}
+
+    def stop(self):
+        self._stopped.set()
+        for client in self.clients:
+            try:
+                client.stop()
+            except Exception:
+                pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_corenlp_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = CoreNLPPool()
+                atexit.register(_pool.stop)
+    return _pool
+
+
+def _sentence_entries(text, ann_sentences):
+    entries = []
+    triplet_sentence = []
+
+    for sentence in ann_sentences:
+        for triple in sentence.openieTriple:
+
+            triplet = {
+                'subject': {'text': triple.subject},
+                'relation': {'text': triple.relation},
+                'object': {'text': triple.object},
+            }
+
+            triplet_sentence.append(triplet)
+
+        if triplet_sentence:
+            entries.append({
+                'sentence_text': text,
+                'triplets': triplet_sentence,
+            })
+
+    return entries
+
+
+def _utf16_length(text):
+    # CoreNLP reports character offsets in Java (UTF-16) code units.
+    return len(text.encode('utf-16-le')) // 2
+
+
+def _windows(texts):
+    window = []
+    window_chars = 0
+
+    for text in texts:
+        if window and (len(window) >= CORENLP_WINDOW_SENTENCES
+                       or window_chars + len(text) > CORENLP_WINDOW_CHARS):
+            yield window
+            window = []
+            window_chars = 0
+
+        window.append(text)
+        window_chars += len(text) + len(SENTENCE_SEPARATOR)
+
+    if window:
+        yield window
+
+
+def _annotate_window(client, texts):
+    starts = []
+    offset = 0
+    for text in texts:
+        starts.append(offset)
+        offset += _utf16_length(text) + _utf16_length(SENTENCE_SEPARATOR)
+
+    ann = client.annotate(SENTENCE_SEPARATOR.join(texts))
+
+    grouped = [[] for _ in texts]
+    for sentence in ann.sentence:
+        if sentence.token:
+            grouped[bisect_right(starts, sentence.token[0].beginChar) - 1].append(sentence)
+
+    entries = []
+    for text, ann_sentences in zip(texts, grouped):
+        entries.extend(_sentence_entries(text, ann_sentences))
+    return entries
+
+
+def extract_triplets(sentences):
+    """OpenIE triples and sentence vectors for every sentence with triples.
+
+    In 'window' mode consecutive sentences are annotated in one request and
+    the triples are mapped back to their source sentence; 'sentence' mode
+    sends one request per sentence. Both produce the same entries.
+    """
+    texts = (span.text if span.text else "Not Found" for span in sentences)
+    pool = get_corenlp_pool()
+    sentences_and_triplets = []
+
+    if CORENLP_ANNOTATION_MODE == 'sentence':
+        with pool.client() as client:
+            for text in texts:
+                sentences_and_triplets.extend(
+                    _sentence_entries(text, client.annotate(text).sentence))
+    else:
+        for window in _windows(texts):
+            with pool.client() as client:
+                sentences_and_triplets.extend(_annotate_window(client, window))
+
+    try:
+        vectors = encode_batch(
+            [item['sentence_text'] for item in sentences_and_triplets])
+    except Exception as e:
+        print(f"Error in encode_batch: {e}")
+        vectors = [None] * len(sentences_and_triplets)
+
+    for item, vector in zip(sentences_and_triplets, vectors):
+        item['sentence_text_vector'] = vector
+
+    return sentences_and_triplets
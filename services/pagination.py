@@ -0,0 +1,170 @@
+import base64
+import binascii
+import json
+import os
+
+from elasticsearch.exceptions import BadRequestError, NotFoundError
+
+PIT_KEEP_ALIVE = os.getenv('PIT_KEEP_ALIVE', '30m')
+PIT_PAGE_SIZE = int(os.getenv('PIT_PAGE_SIZE', 100))
+
+# Listing cursors: how long a client may pause between pages, the page
+# size when none is asked for, and the largest page it may ask for.
+CURSOR_KEEP_ALIVE = os.getenv('CURSOR_KEEP_ALIVE', '5m')
+LIST_PAGE_SIZE = int(os.getenv('LIST_PAGE_SIZE', 10))
+CURSOR_MAX_PAGE_SIZE = int(os.getenv('CURSOR_MAX_PAGE_SIZE', 1000))
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def scan_with_pit(es, index, query=None, source=None, page_size=PIT_PAGE_SIZE, keep_alive=PIT_KEEP_ALIVE):
+    """Yield every hit of index matching query, one page at a time.
+
+    Walks a point in time with search_after, so the whole index is covered
+    (no 10k from/size ceiling) and only one page is held in memory.
+    keep_alive must cover the time the caller spends on a single page.
+    """
+    pit_id = es.open_point_in_time(index=index, keep_alive=keep_alive)['id']
+    search_after = None
+
+    try:
+        while True:
+            body = {
+                'query': query or {'match_all': {}},
+                'size': page_size,
+                'pit': {'id': pit_id, 'keep_alive': keep_alive},
+                'sort': [{'_shard_doc': 'asc'}],
+                'track_total_hits': False,
+            }
+            if source is not None:
+                body['_source'] = source
+            if search_after is not None:
+                body['search_after'] = search_after
+
+            response = es.search(body=body)
+            pit_id = response.get('pit_id', pit_id)
+            hits = response['hits']['hits']
+            if not hits:
+                return
+
+            yield from hits
+            search_after = hits[-1]['sort']
+    finally:
+        try:
+            es.close_point_in_time(id=pit_id)
+        except Exception as e:
+            print(f"Error closing point in time: {e}")
+
+
+def encode_cursor(state):
+    data = json.dumps(state, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def _count(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+
+def decode_cursor(cursor, index):
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, binascii.Error):
+        raise InvalidCursor('Malformed cursor')
+    if (not isinstance(state, dict) or not isinstance(state.get('pit'), (str, type(None)))
+            or not isinstance(state.get('after'), (list, type(None)))
+            or not all(_count(state.get(key)) for key in ('total', 'page', 'seen'))):
+        raise InvalidCursor('Malformed cursor')
+    if state.get('index') != index:
+        raise InvalidCursor('Cursor belongs to another listing')
+    return state
+
+
+def page_size_arg(value, default):
+    """value (a query argument, possibly missing) as a page size within bounds."""
+    try:
+        size = int(value) if value else default
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, CURSOR_MAX_PAGE_SIZE))
+
+
+def _close_pit(es, pit_id):
+    try:
+        es.close_point_in_time(id=pit_id)
+    except Exception as e:
+        print(f"Error closing point in time: {e}")
+
+
+def search_page(es, index, query=None, sort=None, size=PIT_PAGE_SIZE, cursor=None, source=None,
+                keep_alive=CURSOR_KEEP_ALIVE):
+    """One page of a listing, as (hits, pagination) where pagination has
+    total, page and next_cursor.
+
+    The first page is a single plain search and opens nothing, as most
+    clients never ask for a second. A point in time is opened only when
+    its next_cursor is used: the second page is read from it past the hits
+    already seen, in the order the first search returned them (sort, then
+    shard and document). The opaque next_cursor carries the point in time,
+    the sort values of the last hit, the total and the page number, so
+    every later page is a search_after on the same snapshot and costs the
+    same however deep it is. sort should be the same on every call.
+    next_cursor is None on the last page, whose point in time is closed.
+    Raises InvalidCursor when cursor is malformed, expired or from another
+    index.
+    """
+    body = {
+        'query': query or {'match_all': {}},
+        'size': size,
+    }
+    if source is not None:
+        body['_source'] = source
+
+    if not cursor:
+        response = es.search(index=index, body=dict(body, sort=list(sort or []), track_total_hits=True))
+        hits = response['hits']['hits']
+        total = response['hits']['total']['value']
+        next_cursor = None
+        if hits and len(hits) < total:
+            next_cursor = encode_cursor({'index': index, 'pit': None, 'after': None,
+                                         'total': total, 'page': 1, 'seen': len(hits)})
+        return hits, {'total': total, 'page': 1, 'next_cursor': next_cursor}
+
+    state = decode_cursor(cursor, index)
+    if state['pit'] is None:
+        state['pit'] = es.open_point_in_time(index=index, keep_alive=keep_alive)['id']
+        # The first page's ties were broken by shard and document too, so
+        # skipping what it returned lands right after its last hit.
+        body['from'] = state['seen']
+
+    body.update({
+        'pit': {'id': state['pit'], 'keep_alive': keep_alive},
+        'sort': list(sort or []) + [{'_shard_doc': 'asc'}],
+        'track_total_hits': False,
+    })
+    if state['after']:
+        body['search_after'] = state['after']
+
+    try:
+        response = es.search(body=body)
+    except (NotFoundError, BadRequestError):
+        if 'from' in body:
+            _close_pit(es, state['pit'])
+        raise InvalidCursor('Invalid or expired cursor, start again without one')
+
+    hits = response['hits']['hits']
+    state['pit'] = response.get('pit_id', state['pit'])
+    state['page'] += 1
+    state['seen'] += len(hits)
+
+    next_cursor = None
+    # The total is exact and the snapshot fixed, so the last page is known
+    # without asking for an empty one.
+    if hits and state['seen'] < state['total']:
+        state['after'] = hits[-1]['sort']
+        next_cursor = encode_cursor(state)
+    else:
+        _close_pit(es, state['pit'])
+
+    return hits, {'total': state['total'], 'page': state['page'], 'next_cursor': next_cursor}
@@ -0,0 +1,36 @@
+# Kept in _source by both mappings (see config/), but too large to send
+# unless named explicitly.
+VECTOR_FIELDS = ('vector', 'sentence_text_vector')
+
+# What listings return without ?fields=. Full content and vectors are the
+# bulk of a document, so they are only sent when asked for.
+ARTICLE_FIELDS = ('title', 'authors', 'journal', 'abstract', 'doi', 'issn', 'year',
+                  'volume', 'issue', 'pages', 'url', 'pmc_id', 'path')
+TRIPLET_FIELDS = ('article_id', 'sentence_text', 'triplets')
+
+
+def requested_fields(request, default):
+    """Fields named in ?fields=a,b,c, or default when there are none."""
+    fields = [field.strip() for field in request.args.get('fields', '').split(',') if field.strip()]
+    return fields or list(default)
+
+
+def source_filter(fields):
+    """The _source filter that makes Elasticsearch send only fields.
+
+    '*' stands for every field except the vectors, which are only
+    returned when named explicitly.
+    """
+    if '*' in fields:
+        return {'excludes': [field for field in VECTOR_FIELDS if field not in fields]}
+    return {'includes': list(fields)}
+
+
+def project(hit, fields):
+    """The fields of hit's _source, with '' for the ones it lacks."""
+    source = hit.get('_source', {})
+    if '*' in fields:
+        return {name: value for name, value in source.items()
+                if name not in VECTOR_FIELDS or name in fields}
+    # A dotted field (analysis.status) comes back nested under its parent.
+    return {field.split('.', 1)[0]: source.get(field.split('.', 1)[0], '') for field in fields}
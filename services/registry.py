@@ -0,0 +1,80 @@
+import os
+import threading
+
+import spacy
+from sentence_transformers import SentenceTransformer
+
+from services.es_client import create_es
+
+MODEL_NAME = os.getenv('EMBEDDING_MODEL', 'all-mpnet-base-v2')
+# 'torch', 'onnx' or 'onnx-int8'; see scripts/onnxParity.py before switching.
+ENCODER_BACKEND = os.getenv('ENCODER_BACKEND', 'torch')
+# When set, every process encodes through the shared embedding server.
+EMBEDDING_SOCKET = os.getenv('EMBEDDING_SOCKET', '')
+# Vectors from different backends differ slightly, so caches key on both.
+ENCODER_ID = MODEL_NAME if ENCODER_BACKEND == 'torch' else f'{MODEL_NAME}-{ENCODER_BACKEND}'
+SPACY_MODEL = os.getenv('SPACY_MODEL', 'en_core_web_sm')
+SENTENCE_SEGMENTER = os.getenv('SENTENCE_SEGMENTER', 'senter')
+
+# Everything in en_core_web_sm except the standalone senter; none of it is
+# needed to split sentences.
+SENTENCE_EXCLUDE = ["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer", "ner"]
+
+_lock = threading.Lock()
+_model = None
+_nlp = None
+_es = None
+
+
+def load_encoder():
+    """The sentence encoder itself, loaded in this process."""
+    if ENCODER_BACKEND in ('onnx', 'onnx-int8'):
+        from services.onnx_encoder import OnnxSentenceEncoder
+        return OnnxSentenceEncoder(MODEL_NAME, quantized=ENCODER_BACKEND == 'onnx-int8')
+    return SentenceTransformer(MODEL_NAME)
+
+
+def get_model():
+    """The encoder for this process: a client of the shared embedding
+    server when EMBEDDING_SOCKET is set, otherwise a local copy."""
+    global _model
+    if _model is None:
+        with _lock:
+            if _model is None:
+                if EMBEDDING_SOCKET:
+                    from services.embedding_server import EmbeddingClient
+                    _model = EmbeddingClient(EMBEDDING_SOCKET)
+                else:
+                    _model = load_encoder()
+    return _model
+
+
+def _load_sentencizer():
+    if SENTENCE_SEGMENTER == 'senter':
+        nlp = spacy.load(SPACY_MODEL, exclude=SENTENCE_EXCLUDE)
+        if 'senter' in nlp.component_names:
+            nlp.enable_pipe('senter')
+            return nlp
+
+    nlp = spacy.blank('en')
+    nlp.add_pipe('sentencizer')
+    return nlp
+
+
+def get_nlp():
+    global _nlp
+    if _nlp is None:
+        with _lock:
+            if _nlp is None:
+                _nlp = _load_sentencizer()
+    return _nlp
+
+
+def get_es():
+    """The process-wide client every controller, model and service shares."""
+    global _es
+    if _es is None:
+        with _lock:
+            if _es is None:
+                _es = create_es()
+    return _es
@@ -0,0 +1,75 @@
+import os
+
+from services.registry import get_nlp
+
+SPACY_BATCH_SIZE = int(os.getenv('SPACY_BATCH_SIZE', 8))
+SPACY_N_PROCESS = int(os.getenv('SPACY_N_PROCESS', 1))
+SEGMENT_WINDOW_CHARS = int(os.getenv('SEGMENT_WINDOW_CHARS', 100000))
+SEGMENT_OVERLAP_CHARS = int(os.getenv('SEGMENT_OVERLAP_CHARS', 2000))
+
+
+def stream_sentences(content):
+    """Yield the sentences of content one window at a time.
+
+    Only one window is parsed at once, so memory does not grow with the
+    article and spaCy's max_length never applies. Sentences that start in
+    the last SEGMENT_OVERLAP_CHARS of a window may be cut off or split with
+    too little right context, so they are parsed again at the start of the
+    next window instead of being emitted.
+    """
+    nlp = get_nlp()
+    content = content or ''
+    position = 0
+
+    while position < len(content):
+        window = content[position:position + SEGMENT_WINDOW_CHARS]
+        doc = nlp(window)
+
+        if position + len(window) >= len(content):
+            yield from doc.sents
+            return
+
+        sentences = list(doc.sents)
+        if not sentences:
+            position += len(window)
+            continue
+
+        cutoff = len(window) - SEGMENT_OVERLAP_CHARS
+        next_start = None
+
+        for sentence in sentences[:-1]:
+            if sentence.start_char >= cutoff:
+                next_start = sentence.start_char
+                break
+            yield sentence
+
+        if next_start is None:
+            next_start = sentences[-1].start_char
+        if next_start == 0:
+            # A single sentence longer than the window: emit it as it is.
+            yield sentences[0]
+            next_start = sentences[0].end_char
+
+        position += next_start
+
+
+def split_sentences_many(contents):
+    """Yield the sentences of each content, segmenting through nlp.pipe.
+
+    Contents longer than one window are streamed with stream_sentences.
+    """
+    def as_tuples():
+        for content in contents:
+            content = content or ''
+            if len(content) > SEGMENT_WINDOW_CHARS:
+                yield '', content
+            else:
+                yield content, None
+
+    docs = get_nlp().pipe(as_tuples(), as_tuples=True,
+                          batch_size=SPACY_BATCH_SIZE, n_process=SPACY_N_PROCESS)
+    for doc, long_content in docs:
+        if long_content is not None:
+            yield stream_sentences(long_content)
+        else:
+            yield doc.sents
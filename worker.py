@@ -0,0 +1,41 @@
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import os
+import threading
+import time
+
+from controllers.article_controller import ArticleController
+from services.indices import ensure_indices
+from services.jobs import run_workers
+
+REENCODE_SWEEP_INTERVAL = int(os.getenv('REENCODE_SWEEP_INTERVAL', 600))
+
+article_controller = ArticleController()
+
+handlers = {
+    'analyze_all_articles': article_controller.run_analyze_all_articles,
+    'analyze_my_articles': article_controller.run_analyze_my_articles,
+    'post_articles_from_folder': article_controller.run_post_articles_in_folder,
+    'reencode_article': article_controller.run_reencode_article,
+    'reencode_stale': article_controller.run_reencode_stale,
+}
+
+# Re-encoding one article takes a second and the user is waiting on it.
+PRIORITY_KINDS = ('reencode_article',)
+
+
+def sweep_stale_vectors():
+    while True:
+        try:
+            article_controller.sweep_stale_vectors()
+        except Exception as e:
+            print(f"Error sweeping stale vectors: {e}")
+        time.sleep(REENCODE_SWEEP_INTERVAL)
+
+
+if __name__ == '__main__':
+    ensure_indices()
+    threading.Thread(target=sweep_stale_vectors, daemon=True).start()
+    run_workers(handlers, priority_kinds=PRIORITY_KINDS)